@@ -0,0 +1,266 @@
+"""Count cube behind the dashboard figures.
+
+Every dashboard chart is a count of titles over some of the columns below,
+so the cleaned catalog is reduced once to the number of titles for each
+(type, release_year, country, rating) combination, plus the number of
+title/genre pairs for each (type, release_year, country, rating, genre)
+combination, and every chart is answered by slicing and summing those much
+smaller tables.  Both are counted with ``np.bincount`` over the integer
+codes from ``codes.py``.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from codes import CatalogCodes, count_keys
+from instrumentation import instrumented, measure
+from netflix_data import (CHART_COLUMNS, DATA_PATH, compacted_from, concat_titles, dataset_version, live_rows, load_base,
+                          load_deltas, previous_state, save_state)
+from parallel import map_shards, parallel_codes
+
+DIMENSIONS = ['type', 'release_year', 'country', 'rating']
+
+
+def _count_frame(codes, dimensions, keys):
+    vocabularies = [codes.vocabulary(dimension) for dimension in dimensions]
+    combos, counts = count_keys(keys, [len(vocabulary) for vocabulary in vocabularies])
+    columns = {}
+    for dimension, vocabulary, combo in zip(dimensions, vocabularies, combos):
+        if pd.api.types.is_numeric_dtype(vocabulary):
+            columns[dimension] = vocabulary[combo]
+        else:
+            columns[dimension] = pd.Categorical.from_codes(combo, vocabulary)
+    columns['count'] = counts
+    return pd.DataFrame(columns)
+
+
+def _merge_counts(dimensions, frames):
+    """Add up count frames, each multiplied by its sign.
+
+    Categories are merged in the order the frames have them, so merging
+    the cubes of consecutive parts of a catalog keeps the order of first
+    appearance of the whole catalog.
+    """
+    categories = {}
+    for frame, _ in frames:
+        for dimension in dimensions:
+            if isinstance(frame[dimension].dtype, pd.CategoricalDtype):
+                old = categories.get(dimension, pd.Index([]))
+                new = frame[dimension].cat.categories
+                categories[dimension] = old.append(new[~new.isin(old)])
+    aligned = [
+        frame.assign(count=frame['count'] * sign, **{
+            dimension: frame[dimension].cat.set_categories(values)
+            for dimension, values in categories.items()
+        })
+        for frame, sign in frames
+    ]
+    merged = pd.concat(aligned, ignore_index=True)
+    merged = merged.groupby(dimensions, observed=True)['count'].sum().reset_index()
+    return merged[merged['count'] > 0].reset_index(drop=True)
+
+
+class CountCube:
+    """Title counts per combination of ``DIMENSIONS``.
+
+    ``counts`` holds one row per combination that occurs, with the
+    dimension columns plus ``count``.  ``genre_counts`` is the same with an
+    extra ``genre`` column; a title listed under several genres is counted
+    once under each of them, so it must only be used for genre charts.
+    """
+
+    def __init__(self, counts, genre_counts):
+        self.counts = counts
+        self.genre_counts = genre_counts
+
+    @classmethod
+    def from_codes(cls, codes, rows=None):
+        """Build the cube of ``codes``, only over ``rows`` if given.
+
+        ``rows`` is a boolean mask or an array of row positions.
+        """
+        keys = [codes.codes[dimension] for dimension in DIMENSIONS]
+        if rows is not None and rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+
+        # One entry per title/genre pair
+        genre_rows, genres = codes.genres.entries(rows)
+        genre_keys = [key[genre_rows] for key in keys] + [genres]
+
+        if rows is not None:
+            keys = [key[rows] for key in keys]
+        counts = _count_frame(codes, DIMENSIONS, keys)
+        genre_counts = _count_frame(codes, DIMENSIONS + ['genre'], genre_keys)
+        return cls(counts, genre_counts)
+
+    @classmethod
+    def from_titles(cls, titles):
+        return cls.from_codes(CatalogCodes.from_titles(titles))
+
+    def update(self, codes, added=None, removed=None):
+        """Return the cube with the titles at ``added`` counted and those at ``removed`` taken out.
+
+        ``added`` and ``removed`` are row positions in ``codes``.
+        """
+        cubes = [(self, 1)]
+        if added is not None and len(added):
+            cubes.append((CountCube.from_codes(codes, added), 1))
+        if removed is not None and len(removed):
+            cubes.append((CountCube.from_codes(codes, removed), -1))
+        return CountCube._combine(cubes)
+
+    @classmethod
+    def merge(cls, cubes):
+        """Add up the cubes of disjoint parts of a catalog, in catalog order."""
+        return cls._combine([(cube, 1) for cube in cubes])
+
+    @classmethod
+    def _combine(cls, cubes):
+        counts = _merge_counts(DIMENSIONS, [(cube.counts, sign) for cube, sign in cubes])
+        genre_counts = _merge_counts(DIMENSIONS + ['genre'], [(cube.genre_counts, sign) for cube, sign in cubes])
+        return cls(counts, genre_counts)
+
+    def reordered(self, codes):
+        """Return the cube with the categories of its dimensions in the order of the vocabularies of ``codes``."""
+        def reorder(frame):
+            return frame.assign(**{
+                column: frame[column].cat.set_categories(codes.vocabulary(column))
+                for column in frame.columns if isinstance(frame[column].dtype, pd.CategoricalDtype)
+            })
+        return CountCube(reorder(self.counts), reorder(self.genre_counts))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def total(self):
+        return int(self.counts['count'].sum())
+
+    def where(self, **values):
+        """Return the sub-cube where each given dimension equals its value."""
+        counts, genre_counts = self.counts, self.genre_counts
+        for dimension, value in values.items():
+            counts = counts[counts[dimension] == value]
+            genre_counts = genre_counts[genre_counts[dimension] == value]
+        return CountCube(counts, genre_counts)
+
+    def totals(self, *dimensions):
+        """Sum the counts over every dimension not in ``dimensions``."""
+        return self.counts.groupby(list(dimensions), observed=True)['count'].sum()
+
+    def ranking(self, dimension):
+        """Counts per value of ``dimension``, largest first (like ``value_counts``).
+
+        Ties keep the category order, i.e. the order of first appearance in
+        the catalog.
+        """
+        return self.totals(dimension).sort_values(ascending=False, kind='stable')
+
+    def by_year_and_type(self):
+        """Titles per release year and type, for the area chart."""
+        return self.totals('release_year', 'type').reset_index(name='count')
+
+    def top_countries(self, n=10):
+        """The ``n`` countries with the most titles, for the treemaps."""
+        top = self.ranking('country').nlargest(n).reset_index()
+        top.columns = ['country', 'count']
+        return top
+
+    def top_genres_by_country(self, n_countries=10, n_genres=10):
+        """Titles per genre in the top countries, restricted to the top genres.
+
+        Rows are the ``n_countries`` countries with the most titles and
+        columns the ``n_genres`` genres with the most titles among them.
+        Titles listed under several genres count towards each of them.
+        """
+        # Countries are ranked on plain strings, i.e. in alphabetical order
+        country_counts = self.counts.groupby(self.counts['country'].astype(str))['count'].sum()
+        top_countries = country_counts.sort_values(ascending=False).head(n_countries).index
+
+        genre_counts = self.genre_counts.assign(country=self.genre_counts['country'].astype(str))
+        country_genre_counts = genre_counts.groupby(['country', 'genre'], observed=True)['count'].sum().unstack(fill_value=0)
+        top_country_genre = country_genre_counts.loc[top_countries]
+        top_genres = top_country_genre.sum().sort_values(ascending=False).head(n_genres).index
+        return top_country_genre[top_genres]
+
+    def rating_counts(self):
+        """Titles per rating, for the pie chart."""
+        rating_count = self.ranking('rating').reset_index()
+        rating_count.columns = ['rating', 'count']
+        return rating_count
+
+
+def parallel_cube(titles, **options):
+    """Count cube of the cleaned ``titles``, counted shard by shard (see ``parallel.map_shards``)."""
+    cubes = map_shards(CountCube.from_titles, titles, **options)
+    return cubes[0] if len(cubes) == 1 else CountCube.merge(cubes)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('encode')
+def _load_codes(path, version):
+    key = ('codes', path)
+    start, codes = previous_state(key, version)
+    if codes is None:
+        start, old = version[2], compacted_from(key, path, version)
+        if old is None:
+            codes = parallel_codes(load_base(path, version, CHART_COLUMNS))
+        else:
+            # The new snapshot holds the live titles of the version compacted
+            codes, live = _load_codes(path, old), live_rows(path, old)
+            if live is not None:
+                codes = codes.take(np.flatnonzero(live))
+    deltas = load_deltas(path, version, start, CHART_COLUMNS)
+    if deltas:
+        codes = codes.extend(concat_titles(deltas))
+    save_state(key, version, codes)
+    return codes
+
+
+def load_codes(path=DATA_PATH, version=None):
+    """Return the integer coded catalog at ``path``, at the current version by default."""
+    return _load_codes(path, version or dataset_version(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('count_cube')
+def _load_cube(path, version):
+    key = ('cube', path)
+    _, state = previous_state(key, version)
+    old = None if state is not None else compacted_from(key, path, version)
+    codes = _load_codes(path, version)
+    live = live_rows(path, version)
+    if old is not None:
+        # Compacting keeps exactly the live titles, so their counts carry over
+        was_live = live_rows(path, old)
+        n_base = len(_load_codes(path, old)) if was_live is None else int(was_live.sum())
+        state = _load_cube(path, old).reordered(codes), None, n_base
+    if state is None:
+        cube = CountCube.from_codes(codes, live)
+    else:
+        # Count the live titles added since and take out the ones replaced
+        cube, was_live, n_previous = state
+        added = np.arange(n_previous, len(codes))
+        still_live = np.ones(n_previous, dtype=bool)
+        if live is not None:
+            added = added[live[n_previous:]]
+            still_live = live[:n_previous]
+        replaced = ~still_live if was_live is None else was_live & ~still_live
+        cube = cube.update(codes, added, np.flatnonzero(replaced))
+    save_state(key, version, (cube, live, len(codes)))
+    return cube
+
+
+def load_cube(path=DATA_PATH, rows=None, version=None):
+    """Return the count cube of the cleaned catalog at ``path``.
+
+    The cube of the whole catalog is built once per version, from the last
+    one built when deltas were ingested since; the cube of a subset of
+    ``rows`` (a boolean mask, e.g. from ``filters.py``) is built from the
+    cached codes on each call.  ``version`` defaults to the current
+    dataset version.
+    """
+    version = version or dataset_version(path)
+    if rows is None:
+        return _load_cube(path, version)
+    with measure('count_cube:filtered'):
+        return CountCube.from_codes(load_codes(path, version), rows)
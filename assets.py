@@ -0,0 +1,152 @@
+"""Web-optimized copies of the app's images, served as static files.
+
+The source JPEGs are resized to a few widths and re-encoded as WebP and
+progressive JPEG once, into Streamlit's ``static/`` folder next to the app
+(served at ``/app/static/`` when ``server.enableStaticServing`` is on, see
+``.streamlit/config.toml``).  Nothing is decoded on a rerun: the app only
+looks up URLs in ``static/manifest.json``.
+
+File names carry a hash of their content, so a file never changes once
+written.  Streamlit itself sends no ``Cache-Control`` header for static
+files, though; to let browsers keep them, have the reverse proxy in front
+of the app add ``Cache-Control: public, max-age=31536000, immutable`` to
+responses under ``/app/static/``.
+
+Run ``python assets.py`` to build the files ahead of starting the app.
+"""
+import hashlib
+import io
+import json
+import os
+
+import streamlit as st
+from PIL import Image
+
+from instrumentation import instrumented
+from netflix_data import file_version
+
+# Streamlit serves the static/ folder next to the app script, whatever
+# the working directory
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SOURCES = [os.path.join(APP_DIR, 'pic.jpg'), os.path.join(APP_DIR, 'background.jpg')]
+
+STATIC_DIR = os.path.join(APP_DIR, 'static')
+STATIC_URL = '/app/static'
+MANIFEST = 'manifest.json'
+
+# Widths to resize to; images are never scaled up
+WIDTHS = [640, 1280, 1920]
+
+# Pillow save options per file extension, preferred format first
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+MIME_TYPES = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+
+
+def _encode(image, options):
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def _write_variant(static_dir, name, width, extension, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = f'{name}-{width}.{digest}.{extension}'
+    path = os.path.join(static_dir, filename)
+    if not os.path.exists(path):
+        with open(path, 'wb') as file:
+            file.write(data)
+    return filename
+
+
+@instrumented('build_assets')
+def build_assets(sources=SOURCES, static_dir=STATIC_DIR):
+    """Write every variant of ``sources`` to ``static_dir`` and return the manifest."""
+    os.makedirs(static_dir, exist_ok=True)
+    manifest = {}
+    for source in sources:
+        name = os.path.splitext(os.path.basename(source))[0]
+        variants = {}
+        with Image.open(source) as image:
+            image = image.convert('RGB')
+            for width in sorted({min(width, image.width) for width in WIDTHS}):
+                height = round(image.height * width / image.width)
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                variants[str(width)] = {
+                    extension: _write_variant(static_dir, name, width, extension, _encode(resized, options))
+                    for extension, options in FORMATS.items()
+                }
+        manifest[name] = {'source': list(file_version(source)), 'variants': variants}
+
+    path = os.path.join(static_dir, MANIFEST)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def _is_current(manifest, sources, static_dir):
+    for source in sources:
+        entry = manifest.get(os.path.splitext(os.path.basename(source))[0])
+        if entry is None or entry['source'] != list(file_version(source)):
+            return False
+        for files in entry['variants'].values():
+            if not all(os.path.exists(os.path.join(static_dir, filename)) for filename in files.values()):
+                return False
+    return True
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_manifest(sources, static_dir, versions):
+    try:
+        with open(os.path.join(static_dir, MANIFEST)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = {}
+    if not _is_current(manifest, sources, static_dir):
+        manifest = build_assets(sources, static_dir)
+    return manifest
+
+
+def load_manifest(sources=SOURCES, static_dir=STATIC_DIR):
+    """Return the asset manifest, building the files when a source changed."""
+    versions = tuple(file_version(source) for source in sources)
+    return _load_manifest(tuple(sources), static_dir, versions)
+
+
+def _variants(name):
+    variants = load_manifest()[name]['variants']
+    return sorted((int(width), files) for width, files in variants.items())
+
+
+def asset_url(name, width, extension='webp'):
+    """URL of the smallest variant of image ``name`` at least ``width`` pixels wide."""
+    variants = _variants(name)
+    files = next((files for variant_width, files in variants if variant_width >= width), variants[-1][1])
+    return f'{STATIC_URL}/{files[extension]}'
+
+
+def _image_set(files):
+    candidates = ', '.join(
+        f"url('{STATIC_URL}/{files[extension]}') type('{MIME_TYPES[extension]}')"
+        for extension in FORMATS
+    )
+    return f"background-image: url('{STATIC_URL}/{files['jpg']}'); background-image: image-set({candidates});"
+
+
+def responsive_background(selector, name):
+    """CSS rules giving ``selector`` the variant of ``name`` that fits the viewport."""
+    variants = _variants(name)
+    rules = [f'{selector} {{ {_image_set(variants[0][1])} }}']
+    for (previous_width, _), (_, files) in zip(variants, variants[1:]):
+        rules.append(f'@media (min-width: {previous_width + 1}px) {{ {selector} {{ {_image_set(files)} }} }}')
+    return '\n'.join(rules)
+
+
+if __name__ == '__main__':
+    for name, entry in build_assets().items():
+        print(name, ', '.join(sorted(entry['variants'], key=int)))
@@ -0,0 +1,222 @@
+"""Headless benchmark of the data pipeline behind the app.
+
+Runs every stage the app goes through (CSV parsing, cleaning, the
+first-country split, encoding, the count cube, every dashboard aggregation
+and every figure) without Streamlit or a browser, on the bundled catalog and
+on synthetic catalogs of the requested sizes (see ``synthetic_catalog.py``).
+For each stage it reports the wall time and the peak memory allocated, and
+the results are written as JSON so they can be compared between versions.
+Memory is measured with tracemalloc in a second run of the pipeline, since
+tracing slows pandas down too much for the timings of the same run to mean
+anything.
+
+Usage::
+
+    python benchmark.py --sizes 10000 100000 1000000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from aggregates import CountCube, parallel_cube
+from charts import DASHBOARD_CHARTS
+from codes import CatalogCodes
+from netflix_data import DATA_PATH, clean_titles, first_country, read_titles
+from streaming import DEFAULT_CHUNK_SIZE, stream_cube
+from synthetic_catalog import write_catalog
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+DATA_DIR = 'benchmark_data'
+
+
+class StageTimer:
+    """Times the stages of one pipeline run, or tracks their peak memory."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    def run(self, name, function):
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = function()
+        stage = {'stage': name, 'seconds': time.perf_counter() - start}
+        if self.trace_memory:
+            stage['peak_bytes'] = tracemalloc.get_traced_memory()[1] - start_memory
+            tracemalloc.stop()
+        self.stages.append(stage)
+        return result
+
+
+def run_pipeline(path, trace_memory=False, workers=()):
+    """Run the whole pipeline on the catalog at ``path`` and time each stage.
+
+    For each number of ``workers`` the encoding and count cube are also
+    run on that many processes (see ``parallel.py``).  Those runs redo
+    stages the app only runs once, so they are reported apart, in
+    ``parallel_stages``, and left out of ``total_seconds``.  So are the
+    first-country split and the aggregations, reported in
+    ``detail_stages``: they are also part of cleaning and of building the
+    figures, which are timed as a whole.
+    """
+    timer = StageTimer(trace_memory)
+    parallel = StageTimer(trace_memory)
+    detail = StageTimer(trace_memory)
+    raw = timer.run('read_csv', lambda: read_titles(path))
+    detail.run('first_country', lambda: first_country(raw['country'].dropna()))
+    titles = timer.run('clean', lambda: clean_titles(raw))
+    codes = timer.run('encode', lambda: CatalogCodes.from_titles(titles))
+    cube = timer.run('count_cube', lambda: CountCube.from_codes(codes))
+    for n_workers in workers:
+        parallel.run(f'parallel_cube:{n_workers}', lambda: parallel_cube(titles, workers=n_workers, min_rows=0))
+
+    movies, tv_shows = cube.where(type='Movie'), cube.where(type='TV Show')
+    detail.run('agg:by_year_and_type', cube.by_year_and_type)
+    detail.run('agg:movie_countries', movies.top_countries)
+    detail.run('agg:tv_show_countries', tv_shows.top_countries)
+    detail.run('agg:movie_genres', movies.top_genres_by_country)
+    detail.run('agg:tv_show_genres', tv_shows.top_genres_by_country)
+    detail.run('agg:ratings', cube.rating_counts)
+
+    for chart_id, build in DASHBOARD_CHARTS.items():
+        timer.run(f'figure:{chart_id}', lambda: pio.to_json(build(cube), validate=False))
+
+    return {
+        'dataset': path,
+        'rows': len(raw),
+        'clean_rows': len(titles),
+        'total_seconds': sum(stage['seconds'] for stage in timer.stages),
+        'stages': timer.stages,
+        'parallel_stages': parallel.stages,
+        'detail_stages': detail.stages,
+    }
+
+
+def benchmark_catalog(path, memory=True, workers=()):
+    """Time each stage on the catalog at ``path``, then measure its peak memory."""
+    result = run_pipeline(path, workers=workers)
+    if memory:
+        traced = run_pipeline(path, trace_memory=True, workers=workers)
+        for key in ['stages', 'parallel_stages', 'detail_stages']:
+            for stage, traced_stage in zip(result[key], traced[key]):
+                stage['peak_bytes'] = traced_stage['peak_bytes']
+    return result
+
+
+def benchmark_streaming(path, chunk_size=DEFAULT_CHUNK_SIZE, memory=True):
+    """Time building the count cube of ``path`` chunk by chunk, then measure its peak memory."""
+    results = []
+    for trace_memory in [False, True] if memory else [False]:
+        timer = StageTimer(trace_memory)
+        cube = timer.run('stream_cube', lambda: stream_cube(path, chunk_size))
+        results.append(timer.stages)
+    stages = results[0]
+    if memory:
+        stages[0]['peak_bytes'] = results[1][0]['peak_bytes']
+    return {
+        'dataset': f'{path} (streamed, {chunk_size} rows per chunk)',
+        'rows': None,
+        'clean_rows': cube.total(),
+        'total_seconds': stages[0]['seconds'],
+        'stages': stages,
+        'parallel_stages': [],
+        'detail_stages': [],
+    }
+
+
+def catalog_path(n_rows, seed=0, data_dir=DATA_DIR):
+    """Return the synthetic catalog of ``n_rows`` titles, generating it once."""
+    path = os.path.join(data_dir, f'synthetic_{n_rows}_{seed}.csv')
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        write_catalog(path, n_rows, seed=seed)
+    return path
+
+
+def environment():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def max_rss_bytes():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _print_stages(stages, file):
+    for stage in stages:
+        memory = f"{stage['peak_bytes'] / 2 ** 20:10.1f} MiB" if 'peak_bytes' in stage else ''
+        print(f"  {stage['stage']:<24}{stage['seconds'] * 1000:10.1f} ms{memory}", file=file)
+
+
+def print_report(result, file=sys.stderr):
+    print(f"\n{result['dataset']}: {result['clean_rows']} clean rows, {result['total_seconds']:.3f} s", file=file)
+    _print_stages(result['stages'], file)
+    if result['detail_stages']:
+        print('  part of the stages above:', file=file)
+        _print_stages(result['detail_stages'], file)
+    if result['parallel_stages']:
+        print('  not in the total:', file=file)
+        _print_stages(result['parallel_stages'], file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=DEFAULT_SIZES,
+                        help='synthetic catalog sizes to run, e.g. 10000 10000000')
+    parser.add_argument('--no-bundled', action='store_true', help='skip the bundled netflix_titles.csv')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='only time the stages, skipping the memory run')
+    parser.add_argument('--streaming', action='store_true',
+                        help='also build each count cube chunk by chunk (see streaming.py)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per chunk when streaming')
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help='also encode and count on this many processes, e.g. 1 2 4 8')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DATA_DIR, help='where synthetic catalogs are kept')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    paths = [] if args.no_bundled else [DATA_PATH]
+    paths += [catalog_path(size, args.seed, args.data_dir) for size in args.sizes]
+
+    results = []
+    for path in paths:
+        result = benchmark_catalog(path, memory=not args.no_memory, workers=args.workers)
+        print_report(result)
+        results.append(result)
+        if args.streaming:
+            result = benchmark_streaming(path, args.chunk_size, memory=not args.no_memory)
+            print_report(result)
+            results.append(result)
+
+    report = {'environment': environment(), 'max_rss_bytes': max_rss_bytes(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
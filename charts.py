@@ -0,0 +1,117 @@
+"""Plotly figures of the Data Visualization tab.
+
+Each chart is built from a ``CountCube`` (see ``aggregates.py``) so it can
+be rendered by the app, cached, or built headlessly by the benchmarks.
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def release_trend_chart(cube):
+    """Area chart of the number of Movies and TV Shows per release year."""
+    type_count = cube.by_year_and_type()
+
+    # Separate the data for Movies and TV Shows
+    movies_data = type_count[type_count['type'] == 'Movie']
+    tv_shows_data = type_count[type_count['type'] == 'TV Show']
+
+    # Create the area chart
+    fig = go.Figure()
+
+    # Add Movies data
+    fig.add_trace(go.Scatter(
+        x=movies_data['release_year'],
+        y=movies_data['count'],
+        mode='lines',
+        name='Movies',
+        fill='tozeroy',  # Fill the area beneath the line
+        line=dict(color='blue')
+    ))
+
+    # Add TV Shows data
+    fig.add_trace(go.Scatter(
+        x=tv_shows_data['release_year'],
+        y=tv_shows_data['count'],
+        mode='lines',
+        name='TV Shows',
+        fill='tozeroy',  # Fill the area beneath the line
+        line=dict(color='red')
+    ))
+
+    # Update layout for the chart
+    fig.update_layout(
+        title="Number of Movies and TV Shows by Release Year (2005 and 2021)",
+        xaxis_title='Release Year',
+        yaxis_title='Number of Titles',
+        template='plotly',
+        legend_title="Show Type"
+    )
+    return fig
+
+
+def country_treemap(cube, title, color_scale):
+    """Treemap of the top 10 countries by number of titles."""
+    top_10_countries = cube.top_countries(10)
+    return px.treemap(top_10_countries, path=['country'], values='count',
+                      title=title,
+                      color='count',
+                      color_continuous_scale=color_scale)
+
+
+def genre_bar_chart(cube, title, yaxis_title):
+    """Stacked bar chart of the top genres in the top 10 countries."""
+    top_country_genre = cube.top_genres_by_country(10, 10)
+    fig = go.Figure()
+
+    # Loop through each genre to add a trace to the figure
+    for genre in top_country_genre.columns:
+        fig.add_trace(go.Bar(
+            x=top_country_genre.index,
+            y=top_country_genre[genre],
+            name=genre,
+            hoverinfo='y+name',
+        ))
+
+    # Update layout for the stacked bar chart
+    fig.update_layout(
+        title=title,
+        xaxis_title='Country',
+        yaxis_title=yaxis_title,
+        barmode='stack',
+        legend_title='Genre',
+        template='plotly'
+    )
+    return fig
+
+
+def rating_pie(cube):
+    """Pie chart of the distribution of ratings."""
+    rating_count = cube.rating_counts()
+    return px.pie(rating_count, values='count', names='rating', title="Distribution of Netflix Ratings")
+
+
+# Every chart of the tab by id, in display order
+DASHBOARD_CHARTS = {
+    'release_trend': release_trend_chart,
+    'movie_countries': lambda cube: country_treemap(
+        cube.where(type='Movie'),
+        'Top 10 Countries by Number of Movies Produced (2005-2021)',
+        px.colors.sequential.Viridis,
+    ),
+    'tv_show_countries': lambda cube: country_treemap(
+        cube.where(type='TV Show'),
+        'Top 10 Countries by Number of TV Shows Produced (2005-2021)',
+        px.colors.sequential.Plasma[::-1],
+    ),
+    'movie_genres': lambda cube: genre_bar_chart(
+        cube.where(type='Movie'),
+        'Distribution of Top Genres on Movies in Top 10 Countries (2005-2021)',
+        'Number of Movies',
+    ),
+    'tv_show_genres': lambda cube: genre_bar_chart(
+        cube.where(type='TV Show'),
+        'Distribution of Top Genres on TV Shows in Top 10 Countries (2005-2021)',
+        'Number of TV Shows',
+    ),
+    'ratings': rating_pie,
+}
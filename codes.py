@@ -0,0 +1,214 @@
+"""Integer coded view of the catalog for fast counting.
+
+Single valued columns are stored as their categorical codes.  Comma
+separated columns (``listed_in`` and the full ``countries`` list) are split
+into an interned vocabulary plus CSR style ``offsets``/``indices`` arrays,
+so that title ``i`` has the values ``indices[offsets[i]:offsets[i + 1]]``.
+Counts are then plain ``np.bincount`` calls on small integer arrays.
+"""
+import numpy as np
+import pandas as pd
+
+# Single valued columns and the multi valued columns derived from them
+SINGLE_COLUMNS = ['type', 'release_year', 'country', 'rating']
+MULTI_COLUMNS = {'genre': 'listed_in', 'countries': 'countries'}
+
+
+def merge_vocabulary(vocabulary, new_vocabulary):
+    """Append the values of ``new_vocabulary`` missing from ``vocabulary``.
+
+    Returns the merged vocabulary and the code of each value of
+    ``new_vocabulary`` in it; codes of ``vocabulary`` are unchanged.
+    """
+    vocabulary, new_vocabulary = pd.Index(vocabulary), pd.Index(new_vocabulary)
+    remap = vocabulary.get_indexer(new_vocabulary)
+    missing = remap < 0
+    remap[missing] = len(vocabulary) + np.arange(missing.sum())
+    return vocabulary.append(new_vocabulary[missing]), remap
+
+
+class MultiValueColumn:
+    """A comma separated column split into a vocabulary and CSR arrays."""
+
+    def __init__(self, vocabulary, offsets, indices):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.indices = indices
+
+    @classmethod
+    def from_strings(cls, values, sep=','):
+        values = pd.Series(np.asarray(values, dtype=object))
+        flat = values.str.split(sep).explode().str.strip()
+        flat = flat[flat.notna() & (flat != '')]
+
+        # explode() keeps the row order, so the codes are already in CSR order
+        rows = flat.index.to_numpy()
+        indices, vocabulary = pd.factorize(flat.to_numpy())
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(values)), out=offsets[1:])
+        return cls(np.asarray(vocabulary, dtype=object), offsets, indices.astype(np.int32))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self):
+        """Number of values of each row."""
+        return np.diff(self.offsets)
+
+    def row_ids(self):
+        """The row each entry of ``indices`` belongs to."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths())
+
+    def entries(self, rows=None):
+        """Row and value code of each entry, only of the positions ``rows`` if given."""
+        if rows is None:
+            return self.row_ids(), self.indices
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        # Offset of each entry from the start of its row
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(rows, lengths), self.indices[np.repeat(starts, lengths) + within]
+
+    def append(self, other):
+        """Return the rows of ``other`` appended to these, on a merged vocabulary."""
+        vocabulary, remap = merge_vocabulary(self.vocabulary, other.vocabulary)
+        offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]])
+        indices = np.concatenate([self.indices, remap[other.indices].astype(np.int32)])
+        return MultiValueColumn(np.asarray(vocabulary, dtype=object), offsets, indices)
+
+    def take(self, rows):
+        """Return only the rows at the positions ``rows``, as ``from_strings`` would encode them."""
+        lengths = self.offsets[rows + 1] - self.offsets[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        _, indices = self.entries(rows)
+        # Values in order of first appearance among the rows kept
+        indices, values = pd.factorize(indices)
+        return MultiValueColumn(self.vocabulary[values], offsets, indices.astype(np.int32))
+
+    def values_of(self, row):
+        return self.vocabulary[self.indices[self.offsets[row]:self.offsets[row + 1]]].tolist()
+
+    def code_of(self, value):
+        """Return the code of ``value``, or -1 if it never occurs."""
+        found = np.flatnonzero(self.vocabulary == value)
+        return int(found[0]) if len(found) else -1
+
+    def counts(self, rows=None):
+        """Number of rows having each value, optionally only over ``rows``.
+
+        ``rows`` is a boolean mask over the rows.
+        """
+        indices = self.indices
+        if rows is not None:
+            indices = indices[np.repeat(rows, self.lengths())]
+        return np.bincount(indices, minlength=len(self.vocabulary))
+
+
+class CatalogCodes:
+    """Integer codes of the chart columns of a cleaned catalog."""
+
+    def __init__(self, codes, vocabularies, multi):
+        self.codes = codes
+        self.vocabularies = vocabularies
+        self.multi = multi
+
+    @classmethod
+    def from_titles(cls, titles):
+        codes = {}
+        vocabularies = {}
+        for column in SINGLE_COLUMNS:
+            values = titles[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes[column] = values.cat.codes.to_numpy()
+                vocabularies[column] = values.cat.categories
+            else:
+                codes[column], vocabularies[column] = pd.factorize(values, sort=True)
+        multi = {
+            name: MultiValueColumn.from_strings(titles[column])
+            for name, column in MULTI_COLUMNS.items()
+        }
+        return cls(codes, vocabularies, multi)
+
+    def extend(self, titles):
+        """Return these codes with the rows of ``titles`` appended.
+
+        Values not seen before get codes after the existing ones, so the
+        codes of the existing rows stay valid.
+        """
+        return self.append(CatalogCodes.from_titles(titles))
+
+    def append(self, new):
+        """Return these codes with the rows of the codes ``new`` appended, see ``extend``."""
+        codes = {}
+        vocabularies = {}
+        for column in SINGLE_COLUMNS:
+            vocabularies[column], remap = merge_vocabulary(self.vocabularies[column], new.vocabularies[column])
+            codes[column] = np.concatenate([self.codes[column], remap[new.codes[column]]])
+        multi = {name: values.append(new.multi[name]) for name, values in self.multi.items()}
+        return CatalogCodes(codes, vocabularies, multi)
+
+    def take(self, rows):
+        """Return the codes of the rows at the positions ``rows`` only.
+
+        Vocabularies come out as ``from_titles`` makes them from those rows:
+        categorical columns keep every category, sorted ones only keep the
+        values left and split columns are in order of first appearance.
+        """
+        codes = {}
+        vocabularies = {}
+        for column in SINGLE_COLUMNS:
+            codes[column], vocabularies[column] = self.codes[column][rows], self.vocabularies[column]
+            if pd.api.types.is_numeric_dtype(vocabularies[column]):
+                # Sorted codes of the values left, as pd.factorize(sort=True) makes them
+                used, codes[column] = np.unique(codes[column], return_inverse=True)
+                vocabularies[column] = vocabularies[column][used]
+        multi = {name: values.take(rows) for name, values in self.multi.items()}
+        return CatalogCodes(codes, vocabularies, multi)
+
+    def __len__(self):
+        return len(self.codes['type'])
+
+    def vocabulary(self, column):
+        if column in self.multi:
+            return self.multi[column].vocabulary
+        return self.vocabularies[column]
+
+    @property
+    def genres(self):
+        return self.multi['genre']
+
+    @property
+    def countries(self):
+        return self.multi['countries']
+
+    def counts(self, column, rows=None):
+        """Number of titles per value of ``column`` as a Series.
+
+        Works for single valued and multi valued columns alike; a title
+        listed under several genres counts once for each of them.
+        """
+        if column in self.multi:
+            counts = self.multi[column].counts(rows)
+        else:
+            codes = self.codes[column] if rows is None else self.codes[column][rows]
+            counts = np.bincount(codes, minlength=len(self.vocabularies[column]))
+        return pd.Series(counts, index=self.vocabulary(column), name='count')
+
+
+def count_keys(keys, sizes):
+    """Count each distinct combination of the integer code arrays ``keys``.
+
+    Returns the distinct combinations (one array per key, ordered by
+    combination) and how often each one occurs.
+    """
+    flat = np.ravel_multi_index(keys, sizes)
+    space = int(np.prod(sizes, dtype=np.int64))
+    if space <= 1 << 24:
+        counts = np.bincount(flat, minlength=space)
+        present = np.flatnonzero(counts)
+        counts = counts[present]
+    else:
+        # Too many possible combinations for a dense bincount
+        present, counts = np.unique(flat, return_counts=True)
+    return np.unravel_index(present, sizes), counts
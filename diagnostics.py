@@ -0,0 +1,68 @@
+"""Hidden diagnostics page of the app.
+
+Not listed in the navigation; open the app at ``/diagnostics``.  Shows the
+per-stage measurements of ``instrumentation.py`` aggregated over every
+rerun of every session of this process, plus the figure cache counters,
+and offers them as JSON.
+"""
+import json
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from figure_cache import shared_figure_cache
+from instrumentation import ENABLED, ENV_VAR, LOG_ENV_VAR, STATS, TRACE_MEMORY
+
+
+def figure_cache_stats():
+    cache = shared_figure_cache()
+    return {
+        'entries': len(cache),
+        'bytes': cache.size,
+        'max_bytes': cache.max_bytes,
+        'hits': cache.hits,
+        'misses': cache.misses,
+    }
+
+
+def diagnostics_report():
+    """Stage measurements and cache counters as one JSON-ready dict."""
+    return dict(STATS.snapshot(), figure_cache=figure_cache_stats())
+
+
+def diagnostics_page():
+    st.write("### Diagnostics")
+    if not ENABLED:
+        st.info(f"Instrumentation is off. Start the app with `{ENV_VAR}=1` to time every stage, "
+                f"or `{ENV_VAR}=memory` to also count allocations with tracemalloc.")
+
+    report = diagnostics_report()
+    since = datetime.fromtimestamp(report['since']).isoformat(timespec='seconds')
+    st.caption(f"Process {report['pid']}, measuring since {since}"
+               f"{', with memory tracing' if TRACE_MEMORY else ''}.")
+    if TRACE_MEMORY:
+        st.caption("Memory is traced for the whole process: a stage's figures include what other "
+                   "sessions allocated while it ran.")
+
+    if report['stages']:
+        stages = pd.DataFrame(report['stages']).set_index('stage')
+        columns = ['calls', 'total_seconds', 'mean_seconds', 'max_seconds', 'last_seconds']
+        if TRACE_MEMORY:
+            stages['allocated_MiB'] = stages['allocated_bytes'] / 2 ** 20
+            stages['peak_MiB'] = stages['peak_bytes'] / 2 ** 20
+            columns += ['allocated_MiB', 'peak_MiB']
+        st.dataframe(stages[columns])
+    elif ENABLED:
+        st.write("Nothing measured yet: open the other pages first.")
+
+    st.write("#### Figure cache")
+    st.json(report['figure_cache'])
+
+    download, reset = st.columns(2)
+    download.download_button("Download JSON", json.dumps(report, indent=2),
+                             file_name='diagnostics.json', mime='application/json')
+    if reset.button("Reset measurements"):
+        STATS.reset()
+        st.rerun()
+    st.caption(f"Set `{LOG_ENV_VAR}` to a file path to also log every measurement there as a JSON line.")
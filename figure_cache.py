@@ -0,0 +1,86 @@
+"""Process-wide cache of serialized Plotly figures.
+
+Building a figure (aggregating, then running Plotly Express and validating
+every trace) costs far more than reading it back from its JSON spec, and
+most sessions look at the same default dashboard.  Specs are cached by
+(dataset fingerprint, chart id, filter parameters) and shared by every
+session of the process, evicting the least recently used ones once the
+total size goes over a byte budget.
+"""
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+import streamlit as st
+
+from instrumentation import measure
+from netflix_data import DATA_PATH, dataset_version
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FigureCache:
+    """LRU cache of figure JSON specs bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._specs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._specs)
+
+    def get(self, key):
+        """Return the spec stored under ``key``, or ``None``."""
+        with self._lock:
+            spec = self._specs.get(key)
+            if spec is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._specs.move_to_end(key)
+            return spec
+
+    def put(self, key, spec):
+        """Store ``spec`` under ``key``, evicting old specs to stay in budget."""
+        size = len(spec)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._specs.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._specs[key] = spec
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._specs.popitem(last=False)
+                self.size -= len(evicted)
+
+
+@st.cache_resource(show_spinner=False)
+def shared_figure_cache():
+    """The figure cache shared by every session of this process."""
+    return FigureCache()
+
+
+def cached_figure(chart_id, params, build, path=DATA_PATH, version=None):
+    """Return the figure ``chart_id`` for ``params``, building it only on a miss.
+
+    ``params`` must be hashable and identify everything besides the dataset
+    version that the figure depends on, e.g. the filter selection.
+    ``version`` defaults to the current dataset version.
+    """
+    key = (version or dataset_version(path), chart_id, params)
+    cache = shared_figure_cache()
+    spec = cache.get(key)
+    if spec is None:
+        with measure(f'figure:{chart_id}'):
+            figure = build()
+        with measure(f'serialize:{chart_id}'):
+            spec = pio.to_json(figure, validate=False).encode()
+        cache.put(key, spec)
+    with measure(f'deserialize:{chart_id}'):
+        return pio.from_json(spec)
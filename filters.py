@@ -0,0 +1,230 @@
+"""Dashboard filters backed by precomputed bitmaps.
+
+For every value of the filterable columns the rows having that value are
+stored once as a packed bitmap (one bit per title).  A filter is then a few
+bitwise ORs within a column and ANDs across columns over ``n / 8`` bytes,
+instead of comparing every row of the catalog on each widget change.
+A full-text search query (see ``search.py``) can narrow the rows further.
+"""
+import numpy as np
+import streamlit as st
+
+from aggregates import load_codes
+from instrumentation import instrumented
+from netflix_data import DATA_PATH, dataset_version, live_rows, previous_state, save_state
+from search import load_search_index
+
+# Filterable columns, in the order the sidebar shows them
+FILTER_COLUMNS = ['type', 'release_year', 'country', 'genre', 'rating']
+
+# Session state keys of the sidebar widgets
+FILTER_KEYS = ['filter_search', 'filter_type', 'filter_year', 'filter_country', 'filter_genre', 'filter_rating']
+
+
+def _value_bitmaps(rows, codes, n_values, n_rows):
+    """Packed bitmap of the ``rows`` having each of the ``n_values`` codes."""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+    bitmaps = np.zeros((n_values, (n_rows + 7) // 8), dtype=np.uint8)
+    mask = np.zeros(n_rows, dtype=bool)
+    for value in range(n_values):
+        selected = rows[order[bounds[value]:bounds[value + 1]]]
+        mask[selected] = True
+        bitmaps[value] = np.packbits(mask)
+        mask[selected] = False
+    return bitmaps
+
+
+def _column_bitmaps(codes, start):
+    """Bitmaps of each of the ``FILTER_COLUMNS`` over the rows from ``start`` on."""
+    rows = np.arange(start, len(codes))
+    bitmaps = {}
+    for column in FILTER_COLUMNS:
+        if column in codes.multi:
+            value_rows, column_codes = codes.multi[column].entries(rows)
+        else:
+            value_rows, column_codes = rows, codes.codes[column][start:]
+        n_values = len(codes.vocabulary(column))
+        bitmaps[column] = _value_bitmaps(value_rows - start, column_codes, n_values, len(rows))
+    return bitmaps
+
+
+def _year_prefixes(vocabularies, bitmaps):
+    # Years are accumulated in increasing order, whatever order their codes are in
+    order = np.argsort(vocabularies['release_year'], kind='stable')
+    years = bitmaps['release_year'][order]
+    year_prefixes = np.zeros((len(years) + 1, years.shape[1]), dtype=np.uint8)
+    np.bitwise_or.accumulate(years, axis=0, out=year_prefixes[1:])
+    return year_prefixes
+
+
+class BitmapIndex:
+    """Per-value row bitmaps for the ``FILTER_COLUMNS`` of a catalog."""
+
+    def __init__(self, n_rows, vocabularies, bitmaps, year_prefixes):
+        self.n_rows = n_rows
+        self.vocabularies = vocabularies
+        self.bitmaps = bitmaps
+        # year_prefixes[i] has the titles released in one of the first i years
+        self.year_prefixes = year_prefixes
+        self.years = np.sort(vocabularies['release_year'])
+
+    @classmethod
+    def from_codes(cls, codes):
+        vocabularies = {column: list(codes.vocabulary(column)) for column in FILTER_COLUMNS}
+        bitmaps = _column_bitmaps(codes, 0)
+        return cls(len(codes), vocabularies, bitmaps, _year_prefixes(vocabularies, bitmaps))
+
+    def extend(self, codes):
+        """Return the index with the rows of ``codes`` past ``n_rows`` added.
+
+        ``codes`` must be these rows' codes with more appended (see
+        ``CatalogCodes.extend``).  Only the bytes holding new rows are
+        computed again.
+        """
+        n_rows = len(codes)
+        first_byte = self.n_rows // 8
+        vocabularies = {column: list(codes.vocabulary(column)) for column in FILTER_COLUMNS}
+        bitmaps = {}
+        for column, tail in _column_bitmaps(codes, first_byte * 8).items():
+            old = self.bitmaps[column]
+            bitmap = np.zeros((len(tail), (n_rows + 7) // 8), dtype=np.uint8)
+            bitmap[:len(old), :first_byte] = old[:, :first_byte]
+            bitmap[:, first_byte:] = tail
+            bitmaps[column] = bitmap
+        return BitmapIndex(n_rows, vocabularies, bitmaps, _year_prefixes(vocabularies, bitmaps))
+
+    def _codes_of(self, column, values):
+        vocabulary = self.vocabularies[column]
+        return [vocabulary.index(value) for value in values if value in vocabulary]
+
+    def _year_range(self, first, last):
+        start = np.searchsorted(self.years, first, side='left')
+        stop = np.searchsorted(self.years, last, side='right')
+        return self.year_prefixes[stop] & ~self.year_prefixes[start]
+
+    def select(self, selection):
+        """Return the packed bitmap of the rows matching ``selection``.
+
+        ``selection`` maps a column to the list of accepted values (any of
+        them matches), except for ``release_year`` which maps to an
+        inclusive ``(first, last)`` range.  Columns that are missing or
+        map to an empty list are not filtered on.  Returns ``None`` when
+        nothing is filtered.
+        """
+        result = None
+        for column in FILTER_COLUMNS:
+            values = selection.get(column)
+            if column == 'release_year':
+                if values is None:
+                    continue
+                bitmap = self._year_range(*values)
+            else:
+                if not values:
+                    continue
+                codes = self._codes_of(column, values)
+                if codes:
+                    bitmap = np.bitwise_or.reduce(self.bitmaps[column][codes], axis=0)
+                else:
+                    bitmap = np.zeros(self.bitmaps[column].shape[1], dtype=np.uint8)
+            result = bitmap if result is None else result & bitmap
+        return result
+
+    def to_mask(self, bitmap):
+        """Unpack ``bitmap`` into a boolean mask over the rows."""
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
+
+    def select_mask(self, selection):
+        """Like ``select`` but return a boolean row mask (``None`` for all rows)."""
+        bitmap = self.select(selection)
+        return None if bitmap is None else self.to_mask(bitmap)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('bitmap_index')
+def _load_index(path, version):
+    key = ('bitmap_index', path)
+    _, index = previous_state(key, version)
+    codes = load_codes(path, version)
+    if index is None:
+        index = BitmapIndex.from_codes(codes)
+    elif len(codes) > index.n_rows:
+        index = index.extend(codes)
+    save_state(key, version, index)
+    return index
+
+
+def load_index(path=DATA_PATH, version=None):
+    """Return the bitmap index of the cleaned catalog at ``path``, at the current version by default."""
+    return _load_index(path, version or dataset_version(path))
+
+
+@instrumented('select_rows')
+def select_rows(selection, path=DATA_PATH, version=None):
+    """Boolean mask of the titles matching ``selection`` (``None`` for all).
+
+    On top of the ``FILTER_COLUMNS`` a ``search`` entry keeps only the
+    titles matching that full-text query.  Titles replaced by an ingested
+    delta are never selected.  ``version`` defaults to the current dataset
+    version.
+    """
+    version = version or dataset_version(path)
+    rows = load_index(path, version).select_mask(selection)
+    query = selection.get('search')
+    if query:
+        matches = load_search_index(path, version).match_rows(query)
+        if matches is not None:
+            rows = matches if rows is None else rows & matches
+    live = live_rows(path, version)
+    if live is not None:
+        rows = live if rows is None else rows & live
+    return rows
+
+
+def selection_key(selection):
+    """Return a hashable key identifying ``selection``, for caching."""
+    return tuple(
+        (column, tuple(values) if isinstance(values, list) else values)
+        for column, values in sorted(selection.items())
+    )
+
+
+def _default(key, value):
+    # Widgets kept by keep_filters() take their value from the session state
+    return None if key in st.session_state else value
+
+
+def filter_sidebar(path=DATA_PATH, version=None):
+    """Show the filter widgets in the sidebar and return the selection."""
+    index = load_index(path, version)
+    vocabularies = index.vocabularies
+    years = vocabularies['release_year']
+    first, last = int(min(years)), int(max(years))
+
+    st.sidebar.header('Filters')
+    selection = {
+        'search': st.sidebar.text_input('Search titles, cast, directors and descriptions',
+                                        _default('filter_search', ''), key='filter_search').strip(),
+        'type': st.sidebar.multiselect('Type', vocabularies['type'], key='filter_type'),
+        'release_year': st.sidebar.slider('Release year', first, last, _default('filter_year', (first, last)),
+                                          key='filter_year'),
+        'country': st.sidebar.multiselect('Country', sorted(vocabularies['country']), key='filter_country'),
+        'genre': st.sidebar.multiselect('Genre', sorted(vocabularies['genre']), key='filter_genre'),
+        'rating': st.sidebar.multiselect('Rating', vocabularies['rating'], key='filter_rating'),
+    }
+    if selection['release_year'] == (first, last):
+        selection['release_year'] = None
+    return selection
+
+
+def keep_filters():
+    """Keep the filter selection across page switches.
+
+    Streamlit drops the state of widgets missing from a rerun, and each page
+    draws widgets of its own.  Storing the state back under the same keys
+    before the sidebar is drawn makes it plain session state, which the
+    widgets of whichever page is shown pick up.  Call it on every rerun.
+    """
+    for key in FILTER_KEYS:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
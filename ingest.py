@@ -0,0 +1,157 @@
+"""Incremental ingestion of catalog updates.
+
+A delta is a CSV with the columns of netflix_titles.csv holding new titles
+and new versions of existing ones, matched on ``show_id`` (an upsert).
+Only the delta is parsed and cleaned, with the same rules as the CSV, and
+it is saved next to the snapshot as a segment listed in the journal:
+
+* ``netflix_titles.delta-NNNNN.parquet``: the cleaned titles of the delta,
+  left out when the cleaning rules drop all of them
+* ``netflix_titles.delta-NNNNN.ids.parquet``: every ``show_id`` of the
+  delta, whose earlier versions it replaces (even when the new version is
+  dropped by the cleaning rules)
+* ``netflix_titles.journal.json``: the list of segments
+
+The app notices the new dataset version on its next rerun and extends what
+it already built (titles, codes, count cube, bitmaps, search index) with
+the delta alone.  Replacing netflix_titles.csv itself discards the deltas
+and rebuilds everything from the new file.
+
+Every ``COMPACT_AFTER`` deltas the snapshot and the deltas are compacted
+into ``netflix_titles.compact-NNNNN.parquet``, holding only the current
+version of each title, and its search index is built next to it, so that a
+process starting cold reads a single snapshot plus a few deltas.  Running
+processes take the current titles out of what they already built.
+
+Usage::
+
+    python ingest.py delta.csv [more_deltas.csv ...]
+    python ingest.py --compact
+"""
+import argparse
+import contextlib
+import json
+import os
+
+import pandas as pd
+
+from netflix_data import (DATA_PATH, base_path, build_snapshot, clean_titles, file_version, live_rows, load_titles,
+                          read_journal, read_titles)
+from search import save_base_index
+from snapshot import compact_path, journal_path, read_snapshot, segment_path, snapshot_columns, write_snapshot
+
+# Deltas applied on top of a snapshot before they are compacted into a new one
+COMPACT_AFTER = 16
+
+
+def _write_journal(path, source_version, segments, compacted, compacted_from):
+    target = journal_path(path)
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    journal = {
+        'source': list(source_version),
+        'segments': segments,
+        'compacted': compacted,
+        'compacted_from': compacted_from,
+    }
+    with open(tmp_path, 'w') as file:
+        json.dump(journal, file, indent=2)
+    os.replace(tmp_path, target)
+
+
+def _next_label(snapshot, segments):
+    """First index label after the titles already in the catalog."""
+    if segments:
+        return segments[-1]['end']
+    labels = read_snapshot(snapshot, ['show_id']).index
+    return int(labels.max()) + 1 if len(labels) else 0
+
+
+def ingest_delta(delta_path, path=DATA_PATH, compact_after=COMPACT_AFTER):
+    """Apply the delta CSV ``delta_path`` to the catalog at ``path``.
+
+    Compacts the catalog once ``compact_after`` deltas are applied on top
+    of the snapshot (never when ``None``).  Returns the journal entry of
+    the new segment.
+    """
+    source_version = file_version(path)
+    snapshot = build_snapshot(path, source_version)
+    journal = read_journal(path)
+    segments, compacted = journal['segments'], journal['compacted']
+    number = len(segments) + 1
+
+    # Within a delta the last row of a show_id wins
+    delta = read_titles(delta_path).dropna(subset=['show_id'])
+    delta = delta.drop_duplicates('show_id', keep='last')
+    titles = clean_titles(delta)
+    start = _next_label(snapshot, segments)
+    titles.index = pd.RangeIndex(start, start + len(titles))
+
+    # A delta whose titles are all dropped only replaces earlier versions
+    if len(titles):
+        write_snapshot(titles, segment_path(path, number), source_version)
+    write_snapshot(delta[['show_id']].reset_index(drop=True), segment_path(path, number, 'ids.parquet'), source_version)
+    segment = {
+        'delta': os.path.basename(delta_path),
+        'rows': len(delta),
+        'clean_rows': len(titles),
+        'end': start + len(titles),
+    }
+    # The journal is written last, so readers never see a partial segment
+    _write_journal(path, source_version, segments + [segment], compacted, journal['compacted_from'])
+    if compact_after is not None and number - compacted >= compact_after:
+        compact(path)
+    return segment
+
+
+def _remove_files(paths):
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def compact(path=DATA_PATH):
+    """Fold the deltas of the catalog at ``path`` into a new snapshot.
+
+    The new snapshot holds the current version of every title, in catalog
+    order, and its search index is built along with it, so that the app
+    only has to drop the replaced titles from what it already built.
+    Files only older versions of the catalog read are removed,
+    except those of the version before this compaction, which processes
+    may still be loading.  Returns the number of deltas folded in so far.
+    """
+    source_version = file_version(path)
+    journal = read_journal(path)
+    segments, compacted = journal['segments'], journal['compacted']
+    if len(segments) == compacted:
+        return compacted
+
+    version = (source_version, len(segments), compacted)
+    # Hidden columns included, the new snapshot replaces the old one
+    titles = load_titles(path, snapshot_columns(base_path(path, version)), version)
+    live = live_rows(path, version)
+    if live is not None:
+        titles = titles[live]
+    write_snapshot(titles, compact_path(path, len(segments)), source_version)
+    save_base_index(titles, path, source_version, len(segments))
+    _write_journal(path, source_version, segments, len(segments), compacted)
+
+    _remove_files(
+        [segment_path(path, number, suffix) for number in range(1, compacted + 1)
+         for suffix in ('parquet', 'ids.parquet', 'search.npz')]
+        + [compact_path(path, number, suffix) for number in range(1, compacted)
+           for suffix in ('parquet', 'search.npz')]
+    )
+    return len(segments)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('deltas', nargs='*', help='delta CSV files, applied in order')
+    parser.add_argument('--catalog', default=DATA_PATH, help='catalog CSV the deltas apply to')
+    parser.add_argument('--compact', action='store_true', help='compact the deltas into a new snapshot afterwards')
+    args = parser.parse_args()
+    for delta_path in args.deltas:
+        segment = ingest_delta(delta_path, args.catalog)
+        print(f"{delta_path}: {segment['rows']} rows, {segment['clean_rows']} after cleaning")
+    if args.compact:
+        print(f'compacted {compact(args.catalog)} deltas')
@@ -0,0 +1,166 @@
+"""Per-stage timings and memory counters of the data pipeline.
+
+Off by default.  Start the app with ``NETFLIX_INSTRUMENT=1`` to time every
+pipeline stage and chart build, or ``NETFLIX_INSTRUMENT=memory`` to also
+count the bytes allocated while each stage runs with tracemalloc (which
+slows pandas down noticeably, so only turn it on while investigating).
+tracemalloc only counts the memory of the whole process, so these figures
+include whatever other sessions allocate meanwhile; they are exact only
+while a single session is using the app.  When off,
+``instrumented`` hands back the function it decorates unchanged and
+``measure`` a shared no-op context manager, so instrumented code runs as
+if nothing was there.
+
+Measurements from every rerun of every session are added up per stage in
+``STATS``, shared by the whole process, and shown on the hidden
+diagnostics page (``/diagnostics``, see ``diagnostics.py``).  With
+``NETFLIX_INSTRUMENT_LOG=path`` each measurement is also appended to
+``path`` as a JSON line.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+ENV_VAR = 'NETFLIX_INSTRUMENT'
+LOG_ENV_VAR = 'NETFLIX_INSTRUMENT_LOG'
+
+MODE = os.environ.get(ENV_VAR, '').strip().lower()
+ENABLED = MODE not in ('', '0', 'false', 'off')
+TRACE_MEMORY = MODE == 'memory'
+
+logger = logging.getLogger(__name__)
+LOG_PATH = os.environ.get(LOG_ENV_VAR)
+if ENABLED and LOG_PATH:
+    _handler = logging.FileHandler(LOG_PATH)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class StageStats:
+    """Running totals of the measurements of each stage."""
+
+    def __init__(self):
+        self.since = time.time()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, allocated_bytes=None, peak_bytes=None):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {
+                    'stage': stage, 'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                    'last_seconds': 0.0, 'allocated_bytes': 0, 'peak_bytes': 0,
+                }
+            entry['calls'] += 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            entry['last_seconds'] = seconds
+            if allocated_bytes is not None:
+                entry['allocated_bytes'] += allocated_bytes
+                entry['peak_bytes'] = max(entry['peak_bytes'], peak_bytes)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.since = time.time()
+
+    def snapshot(self):
+        """Every stage's totals, slowest in total first, plus how they were measured."""
+        with self._lock:
+            stages = [dict(entry, mean_seconds=entry['total_seconds'] / entry['calls'])
+                      for entry in self._stages.values()]
+        stages.sort(key=lambda entry: entry['total_seconds'], reverse=True)
+        return {
+            'enabled': ENABLED,
+            'trace_memory': TRACE_MEMORY,
+            'pid': os.getpid(),
+            'since': self.since,
+            'stages': stages,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+
+# Shared by every session of the process
+STATS = StageStats()
+
+# Measurements in progress in any thread; the traced peak is process-wide,
+# so every one of them has to see it before it is reset
+_open = set()
+_open_lock = threading.Lock()
+
+
+def _record_peak():
+    """Hand the traced peak so far to every open measurement; returns the current size."""
+    current, peak = tracemalloc.get_traced_memory()
+    for measurement in _open:
+        measurement.peak = max(measurement.peak, peak)
+    return current
+
+
+class _Measurement:
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        if TRACE_MEMORY:
+            with _open_lock:
+                current = _record_peak()
+                tracemalloc.reset_peak()
+                self.start_memory = self.peak = current
+                _open.add(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        allocated_bytes = peak_bytes = None
+        if TRACE_MEMORY:
+            with _open_lock:
+                current = _record_peak()
+                _open.discard(self)
+            allocated_bytes = current - self.start_memory
+            peak_bytes = self.peak - self.start_memory
+        STATS.record(self.stage, seconds, allocated_bytes, peak_bytes)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'time': time.time(), 'pid': os.getpid(), 'stage': self.stage, 'seconds': seconds,
+                'allocated_bytes': allocated_bytes, 'peak_bytes': peak_bytes,
+            }))
+
+
+_DISABLED = contextlib.nullcontext()
+
+
+def measure(stage):
+    """Context manager measuring the code it wraps as ``stage``."""
+    return _Measurement(stage) if ENABLED else _DISABLED
+
+
+def instrumented(stage):
+    """Decorator measuring each call of the function as ``stage``.
+
+    Put it under ``st.cache_resource``/``st.cache_data`` so that only
+    cache misses, i.e. actual work, are measured.
+    """
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _Measurement(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,367 @@
+"""Loading and cleaning of the Netflix titles catalog.
+
+Streamlit reruns ``netflixdataset.py`` top to bottom on every widget
+interaction, so everything here is parsed and cleaned once, saved as a
+columnar snapshot (see ``snapshot.py``) and reused until the CSV on disk
+changes.  Run ``python netflix_data.py`` to build the snapshot ahead of
+starting the app.
+
+Updates ingested with ``ingest.py`` are applied on top of the snapshot as
+delta segments.  The dataset version (``dataset_version``) counts them, and
+the loaders here and in the other modules build each version from the last
+one they built plus the deltas since, so only the new rows are processed.
+Every few deltas they are compacted into a new snapshot, which bounds how
+many segments a cold start has to read.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import instrumented
+from snapshot import (compact_path, is_current, journal_path, read_snapshot, segment_path, snapshot_columns, snapshot_path,
+                      write_snapshot_chunks)
+
+DATA_PATH = 'netflix_titles.csv'
+
+# Columns a title must have to be kept in the report
+REQUIRED_COLUMNS = ['title', 'country', 'release_year', 'rating', 'duration', 'type', 'listed_in']
+
+# The report covers releases from this year onwards
+MIN_RELEASE_YEAR = 2005
+
+# Rows of the CSV parsed at a time while building the snapshot
+SNAPSHOT_CHUNK_SIZE = 100_000
+
+# Explicit dtypes so pandas does not have to infer them while parsing
+CSV_DTYPES = {
+    'show_id': 'string',
+    'type': 'category',
+    'title': 'string',
+    'director': 'string',
+    'cast': 'string',
+    'country': 'string',
+    'date_added': 'string',
+    # Nullable while parsing: titles without a year are dropped by clean_titles()
+    'release_year': 'Int16',
+    'rating': 'category',
+    'duration': 'string',
+    'listed_in': 'string',
+    'description': 'string',
+}
+
+CATEGORY_COLUMNS = ['type', 'rating', 'country']
+
+# Snapshot columns that are only read when asked for by name, never shown
+# with the titles
+HIDDEN_COLUMNS = ['countries']
+
+# Columns the dashboard charts need
+CHART_COLUMNS = ['type', 'country', 'countries', 'release_year', 'listed_in', 'rating']
+
+
+def file_version(path=DATA_PATH):
+    """Return a cheap fingerprint of ``path`` used as the cache key."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _parse_dates(df):
+    # Some dates are stored with a leading space, e.g. " August 4, 2017"
+    if 'date_added' in df:
+        df['date_added'] = pd.to_datetime(df['date_added'].str.strip(), format='%B %d, %Y', errors='coerce')
+    return df
+
+
+@instrumented('read_csv')
+def read_titles(path=DATA_PATH):
+    """Parse the catalog CSV with explicit dtypes."""
+    return _parse_dates(pd.read_csv(path, dtype=CSV_DTYPES))
+
+
+def read_title_chunks(path=DATA_PATH, columns=None, chunk_size=100_000):
+    """Parse the catalog CSV ``chunk_size`` rows at a time, yielding a frame per chunk.
+
+    Only ``columns`` are parsed when given, e.g. to leave out ``cast`` and
+    ``description``.
+    """
+    dtypes = {column: dtype for column, dtype in CSV_DTYPES.items() if columns is None or column in columns}
+    for chunk in pd.read_csv(path, dtype=dtypes, usecols=columns, chunksize=chunk_size):
+        yield _parse_dates(chunk)
+
+
+@instrumented('first_country')
+def first_country(country):
+    """Keep only the first country of a comma separated list."""
+    # partition() has no columns to return for an empty chunk
+    if country.empty:
+        return country
+    parts = country.str.partition(',')
+    has_many = parts[1] == ','
+    return parts[0].str.strip().where(has_many, country)
+
+
+def as_category(values):
+    """Convert ``values`` to a categorical ordered by first appearance."""
+    values = values.astype(object)
+    return values.astype(pd.CategoricalDtype(pd.unique(values.dropna())))
+
+
+@instrumented('clean')
+def clean_titles(df):
+    """Apply the report's cleaning rules to a raw catalog frame."""
+    # 1. Remove Null Values
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    df = df.assign(release_year=df['release_year'].astype('int16'))
+
+    # 2. Keep only the first country (if multiple are listed), the full
+    # list stays available as the hidden 'countries'
+    country = df['country'].astype('string')
+    df = df.assign(country=first_country(country), countries=country)
+    df = df[df['release_year'] >= MIN_RELEASE_YEAR]
+
+    # Categories are kept in order of first appearance so that ties in
+    # value_counts() rank the same way they did on plain strings
+    return df.assign(**{column: as_category(df[column]) for column in CATEGORY_COLUMNS})
+
+
+def build_snapshot(path=DATA_PATH, version=None, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    """Write the cleaned snapshot of ``path`` unless an up to date one exists.
+
+    The CSV is parsed and cleaned ``chunk_size`` rows at a time, so memory
+    stays bounded by the chunk size however large the catalog is.
+    """
+    version = version or file_version(path)
+    target = snapshot_path(path)
+    if not is_current(target, version):
+        chunks = (clean_titles(chunk) for chunk in read_title_chunks(path, chunk_size=chunk_size))
+        write_snapshot_chunks(chunks, target, version)
+    return target
+
+
+def read_journal(path=DATA_PATH):
+    """Return the journal of the delta segments ingested on top of the snapshot of ``path``.
+
+    ``segments`` lists every segment ingested, and the first ``compacted``
+    of them are folded into the compacted snapshot (see ``ingest.compact``),
+    which was built from the one compacted up to ``compacted_from``.
+    Segments ingested against another version of the CSV are ignored:
+    replacing the CSV starts the catalog over.
+    """
+    try:
+        with open(journal_path(path)) as file:
+            journal = json.load(file)
+    except (OSError, ValueError):
+        journal = {}
+    if journal.get('source') != list(file_version(path)):
+        journal = {}
+    return {
+        'segments': journal.get('segments', []),
+        'compacted': journal.get('compacted', 0),
+        'compacted_from': journal.get('compacted_from', 0),
+    }
+
+
+def dataset_version(path=DATA_PATH):
+    """Fingerprint of the catalog.
+
+    The CSV's fingerprint, the number of deltas ingested and the number of
+    them folded into the compacted snapshot.
+    """
+    journal = read_journal(path)
+    return file_version(path), len(journal['segments']), journal['compacted']
+
+
+def same_base(version, other):
+    """Tell whether two dataset versions start from the same snapshot."""
+    return version[0] == other[0] and version[2] == other[2]
+
+
+def _read_titles(snapshot, columns):
+    # Every column but the hidden ones unless asked for
+    if columns is None:
+        columns = [column for column in snapshot_columns(snapshot) if column not in HIDDEN_COLUMNS]
+    return read_snapshot(snapshot, columns)
+
+
+def base_path(path, version):
+    """The snapshot file ``version`` starts from, built if need be."""
+    source_version, _, compacted = version
+    if compacted == 0:
+        return build_snapshot(path, source_version)
+    return compact_path(path, compacted)
+
+
+def load_base(path, version, columns=None):
+    """Titles of the snapshot ``version`` starts from, before its deltas.
+
+    ``columns`` defaults to every column but the ``HIDDEN_COLUMNS``.
+    """
+    return _read_titles(base_path(path, version), columns)
+
+
+def delta_segments(path, version, start=None):
+    """Number and journal entry of each delta of ``version`` after segment ``start``.
+
+    ``start`` defaults to the last compacted segment, i.e. every delta
+    applied on top of ``load_base``.
+    """
+    _, n_segments, compacted = version
+    start = compacted if start is None else start
+    segments = read_journal(path)['segments'][start:n_segments]
+    return list(enumerate(segments, start + 1))
+
+
+def load_deltas(path, version, start=None, columns=None):
+    """Titles added by the deltas of ``version`` after segment ``start``, one frame per delta.
+
+    Deltas whose rows were all dropped by the cleaning rules have no
+    titles and are left out.  ``columns`` defaults to every column but the
+    ``HIDDEN_COLUMNS``.
+    """
+    return [_read_titles(segment_path(path, number), columns)
+            for number, segment in delta_segments(path, version, start) if segment['clean_rows']]
+
+
+def concat_titles(frames):
+    """Concatenate cleaned frames, merging the categories of their categorical columns.
+
+    Categories keep the order they have in the first frame having them,
+    and new ones come after them.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    categories = {}
+    for frame in frames:
+        for column in frame.columns:
+            if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                old = categories.get(column, pd.Index([]))
+                new = frame[column].cat.categories
+                categories[column] = old.append(new[~new.isin(old)])
+    return pd.concat([
+        frame.assign(**{column: frame[column].astype(pd.CategoricalDtype(values))
+                        for column, values in categories.items()})
+        for frame in frames
+    ])
+
+
+# Latest state each incremental loader built, by loader and arguments
+_states = {}
+_states_lock = threading.Lock()
+
+
+def previous_state(key, version):
+    """State ``key`` was last saved with for ``version`` or an earlier version of it.
+
+    Returns the number of segments that state covers and the state, or
+    ``(None, None)`` when there is none to start from, e.g. because the
+    CSV was replaced or the deltas compacted since.
+    """
+    with _states_lock:
+        saved = _states.get(key)
+    if saved is None:
+        return None, None
+    saved_version, state = saved
+    if not same_base(saved_version, version) or saved_version[1] > version[1]:
+        return None, None
+    return saved_version[1], state
+
+
+def compacted_from(key, path, version):
+    """The version the snapshot of ``version`` was compacted from, if ``key`` has state to build it.
+
+    The compacted snapshot holds the live titles of that version, in order,
+    so a loader can take them from its state of that version instead of
+    building everything again from the new snapshot.  Returns ``None``
+    when there is no such state.
+    """
+    source_version, _, compacted = version
+    journal = read_journal(path)
+    if compacted == 0 or journal['compacted'] != compacted:
+        return None
+    with _states_lock:
+        saved = _states.get(key)
+    old = source_version, compacted, journal['compacted_from']
+    if saved is None or not same_base(saved[0], old) or saved[0][1] > compacted:
+        return None
+    return old
+
+
+def save_state(key, version, state):
+    """Save ``state`` as built for ``version``, to extend when a later delta comes in."""
+    with _states_lock:
+        saved = _states.get(key)
+        if saved is None or not same_base(saved[0], version) or saved[0][1] <= version[1]:
+            _states[key] = (version, state)
+
+
+# A new version is built from the state of the previous one when this
+# process has it, with only the deltas since then read and appended;
+# otherwise from the snapshot plus every delta after it.  Every version is a
+# full copy of the catalog, so only the last few are cached; an evicted
+# head is still handed back by previous_state() without reading anything
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('load_titles')
+def _load_titles(path, version, columns):
+    key = ('titles', path, columns)
+    start, titles = previous_state(key, version)
+    columns = list(columns) if columns else None
+    if titles is None:
+        start, titles = version[2], load_base(path, version, columns)
+    titles = concat_titles([titles] + load_deltas(path, version, start, columns))
+    save_state(key, version, titles)
+    return titles
+
+
+def load_titles(path=DATA_PATH, columns=None, version=None):
+    """Return the cleaned catalog, rebuilding the snapshot when the CSV changed.
+
+    Only ``columns`` are read from the snapshot when given, otherwise every
+    column but the ``HIDDEN_COLUMNS``.  ``version``
+    defaults to the current dataset version; a rerun should read it once and
+    pass it to every loader, so that all of them see the same deltas even
+    when one is ingested meanwhile.  Titles from
+    ingested deltas come after those of the snapshot; the rows they
+    replace are kept so positions stay stable, see ``live_rows``.  The
+    frame is shared by every session of the process, so callers must not
+    modify it in place.
+    """
+    return _load_titles(path, version or dataset_version(path), tuple(columns) if columns else None)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('live_rows')
+def _live_rows(path, version):
+    segments = delta_segments(path, version)
+    if not segments:
+        return None
+    show_ids = _load_titles(path, version, ('show_id',))['show_id']
+    numbers = [number for number, _ in segments]
+    lengths = [segment['clean_rows'] for _, segment in segments]
+
+    # Segment each title comes from (0 for the snapshot) and the last
+    # segment listing each replaced show_id
+    row_segments = np.repeat([0] + numbers, [len(show_ids) - sum(lengths)] + lengths)
+    replaced = pd.concat([
+        read_snapshot(segment_path(path, number, 'ids.parquet')).assign(segment=number)
+        for number in numbers
+    ])
+    last_segments = replaced.drop_duplicates('show_id', keep='last').set_index('show_id')['segment']
+    replaced_by = last_segments.reindex(show_ids).to_numpy(dtype=float)
+    # No later segment replaced the title (NaN compares as False)
+    return ~(replaced_by > row_segments)
+
+
+def live_rows(path=DATA_PATH, version=None):
+    """Boolean mask of the titles no later delta replaced (``None`` when all are).
+
+    ``version`` defaults to the current dataset version.
+    """
+    return _live_rows(path, version or dataset_version(path))
+
+
+if __name__ == '__main__':
+    print(build_snapshot())
@@ -1,9 +1,18 @@
+import functools
+
 import streamlit as st
 import pandas as pd
-from PIL import Image
-import plotly.express as px  
+from aggregates import load_cube
+from assets import asset_url, responsive_background
+from charts import DASHBOARD_CHARTS
+from diagnostics import diagnostics_page
+from figure_cache import cached_figure
+from filters import filter_sidebar, keep_filters, select_rows, selection_key
+from instrumentation import measure
+from netflix_data import dataset_version, load_titles
+from search import load_search_index
+from tables import combine_rows, complete_rows, describe_rows, paged_table, row_positions
 import matplotlib.pyplot as plt
-import plotly.graph_objects as go
 
 # Set the page configuration
 st.set_page_config(
@@ -12,8 +21,8 @@ st.set_page_config(
     layout="centered",
 )
 
-# Load the image using PIL (Make sure the image is in your project folder)
-image = Image.open("pic.jpg")
+# Show the header image from the web-optimized static copies (see assets.py)
+st.image(asset_url("pic", 1280))
 
 # Display the image in the background with custom CSS for blur
 st.markdown(
@@ -27,12 +36,12 @@ st.markdown(
         left: 0;
         width: 50%;
         height: 50%;
-        background-image: url('data:image/jpeg;base64,{st.image(image).image_data}');
         background-size: cover;
         background-repeat: no-repeat;
         background-attachment: fixed;
         z-index: -2;
     }}
+    {responsive_background(".background", "pic")}
 
      .main-content {{
         font-family: 'Lato', sans-serif;
@@ -107,23 +116,25 @@ st.markdown(
 # Title of the app with 'h1' tag style
 st.title("Netflix Data Science Project")
 
-# Load dataset directly from the file
-df = pd.read_csv('netflix_titles.csv')
-
-# Data Cleaning
-# 1. Remove Null Values
-df.dropna(subset=['title', 'country', 'release_year', 'rating', 'duration', 'type', 'listed_in'], inplace=True)
 
-# 2. Keep only the first country (if multiple are listed)
-df['country'] = df['country'].apply(lambda x: x.split(',')[0].strip() if ',' in x else x)
-df = df[df['release_year'] >= 2005]
+# Only the data pages show the filters
+def sidebar_selection(version):
+    """Show the sidebar filters of the data pages and return the selection."""
+    with measure("sidebar"):
+        return filter_sidebar(version=version)
 
-# Create tabs
-OverviewTab, DashboadTab, AnalysisTab = st.tabs(["Dataset Overview", "Data Visualization", "Analysis"])
 
 # Data Overview tab
-with OverviewTab:  
-    
+def overview_page():
+    # Every table below is read at the same dataset version, even if a
+    # delta is ingested during the rerun
+    version = dataset_version()
+    # Load the cleaned dataset (parsed once per process, see netflix_data.py)
+    df = load_titles(version=version)
+    # Rows selected in the sidebar filters (None when nothing is filtered)
+    selection = sidebar_selection(version)
+    selected_rows = select_rows(selection, version=version)
+
     st.write("### Introduction", ":clipboard:")
     st.markdown(
         '<p class="text-section">Netflix is one of the most widely used media and video streaming platforms. They have over 15,000 movies and television shows available on their platform, and as of mid-2021, they had over 200+ million subscribers worldwide. This tabular dataset, with over 8000+ rows and 12 columns, contains listings of the movies and TV shows accessible on Netflix, together with information such as cast, directors, ratings, release year, duration, and so on.</p>', 
@@ -144,8 +155,8 @@ with OverviewTab:
 
 
     st.divider()
-#Clean the dataset
-    df_cleaned = df.dropna()
+#Clean the dataset: keep only the titles that have every column filled in
+    cleaned_rows = combine_rows(complete_rows(version=version), selected_rows)
 
     st.markdown('<p class = "special-text">Source:<p>', unsafe_allow_html=True)
     st.markdown('<p class = "text-another"> This dataset is available through Kaggle.<p>', unsafe_allow_html=True)
@@ -156,225 +167,147 @@ with OverviewTab:
 
     st.write("## Netflix Dataset Overview", ":bar_chart:")
 
+    # Search results, best match first
+    if selection['search']:
+        st.write("### Search Results")
+        ranked = load_search_index(version=version).search(selection['search'], limit=len(df))
+        if selected_rows is not None:
+            ranked = ranked[selected_rows[ranked]]
+        st.write(f"*Matching titles:* {len(ranked)}")
+        st.dataframe(df.iloc[ranked[:20]][['title', 'type', 'director', 'release_year', 'country']])
+        st.divider()
+
     # Before Data Cleaning
     st.write('### Before Data Cleaning')
     st.write("#### Dataset")
-    st.dataframe(df)
+    paged_table(df, selected_rows, key='dataset', version=version)
+    dataset_positions = row_positions(len(df), selected_rows)
 
     st.write("### Basic Statistics")
-    st.write(df.describe())
+    st.write(describe_rows(df, selected_rows, ('dataset', selection_key(selection)), version=version))
 
-    st.write(f"*Number of rows:* {df.shape[0]}")
+    st.write(f"*Number of rows:* {len(dataset_positions)}")
     st.write(f"*Number of columns:* {df.shape[1]}")
     st.divider()
     # After Data Cleaning
     st.write('### After Data Cleaning')
     
-    st.dataframe(df_cleaned)
+    paged_table(df, cleaned_rows, key='cleaned', version=version)
+    cleaned_positions = row_positions(len(df), cleaned_rows)
 
     st.divider()
 
     st.write("### Basic Statistics")
-    st.write(df_cleaned.describe())
+    st.write(describe_rows(df, cleaned_rows, ('cleaned', selection_key(selection)), version=version))
 
-    st.write(f"*Number of rows:* {df_cleaned.shape[0]}")
-    st.write(f"*Number of columns:* {df_cleaned.shape[1]}")
+    st.write(f"*Number of rows:* {len(cleaned_positions)}")
+    st.write(f"*Number of columns:* {df.shape[1]}")
 
     st.divider()
 
     st.write("### First 5 Rows of the Dataset")
-    st.write(df_cleaned.head())
+    st.write(df.iloc[cleaned_positions[:5]])
+
+
+# Data Visualization tab
+def dashboard_page():
+    version = dataset_version()
+    selection = sidebar_selection(version)
+    selected_rows = select_rows(selection, version=version)
+    st.markdown("<h3><span style='color:red'>Netflix</span> Data Visualization of 2005 - 2021</h3>", unsafe_allow_html=True)
+    # Every chart below is answered from the count cube of the selected
+    # rows, which is only built when a chart is missing from the cache
+    @functools.cache
+    def dashboard_cube():
+        return load_cube(rows=selected_rows, version=version)
+
+    def dashboard_chart(chart_id):
+        build = lambda: DASHBOARD_CHARTS[chart_id](dashboard_cube())
+        return cached_figure(chart_id, selection_key(selection), build, version=version)
+
+    # Display the plot in Streamlit
+    st.plotly_chart(dashboard_chart('release_trend'))
+
+    st.markdown("<i><small>📈 **Figure 1**: This **area chart** illustrates the trends in **Netflix releases** for **Movies and TV Shows** from **2005 to 2021**.</small></i>", unsafe_allow_html=True)
+    st.markdown("<small><b>Movies:</b> The number of movie releases surged significantly between 2016 and 2017, with the highest count in 2017 at 729 titles. After 2017, the number of movie releases decreased steadily, with a sharp drop after 2019.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>TV Shows</b>: While starting with lower numbers, TV show releases gradually increased, peaking in 2020 with 391 titles. The rise was more consistent compared to movies, but there was a sharp decline post-2020.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>General Trend:</b> Movies dominated in volume throughout the period, but TV Shows saw steady growth, particularly from 2005 onward. The decline in both categories after 2020 may reflect broader industry shifts or impacts, potentially due to the global pandemic.</small>", unsafe_allow_html=True)
     
-    with DashboadTab:
-        st.markdown("<h3><span style='color:red'>Netflix</span> Data Visualization of 2005 - 2021</h3>", unsafe_allow_html=True)
-        type_count = df.groupby(['release_year', 'type']).size().reset_index(name='count')
-
-        # Separate the data for Movies and TV Shows
-        movies_data = type_count[type_count['type'] == 'Movie']
-        tv_shows_data = type_count[type_count['type'] == 'TV Show']
-
-        # Create the area chart
-        fig = go.Figure()
-
-        # Add Movies data
-        fig.add_trace(go.Scatter(
-            x=movies_data['release_year'],
-            y=movies_data['count'],
-            mode='lines',
-            name='Movies',
-            fill='tozeroy',  # Fill the area beneath the line
-            line=dict(color='blue')
-        ))
-
-        # Add TV Shows data
-        fig.add_trace(go.Scatter(
-            x=tv_shows_data['release_year'],
-            y=tv_shows_data['count'],
-            mode='lines',
-            name='TV Shows',
-            fill='tozeroy',  # Fill the area beneath the line
-            line=dict(color='red')
-        ))
-
-        # Update layout for the chart
-        fig.update_layout(
-            title="Number of Movies and TV Shows by Release Year (2005 and 2021)",
-            xaxis_title='Release Year',
-            yaxis_title='Number of Titles',
-            template='plotly',
-            legend_title="Show Type"
-        )
-
-        # Display the plot in Streamlit
-        st.plotly_chart(fig)
-
-        st.markdown("<i><small>📈 **Figure 1**: This **area chart** illustrates the trends in **Netflix releases** for **Movies and TV Shows** from **2005 to 2021**.</small></i>", unsafe_allow_html=True)
-        st.markdown("<small><b>Movies:</b> The number of movie releases surged significantly between 2016 and 2017, with the highest count in 2017 at 729 titles. After 2017, the number of movie releases decreased steadily, with a sharp drop after 2019.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>TV Shows</b>: While starting with lower numbers, TV show releases gradually increased, peaking in 2020 with 391 titles. The rise was more consistent compared to movies, but there was a sharp decline post-2020.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>General Trend:</b> Movies dominated in volume throughout the period, but TV Shows saw steady growth, particularly from 2005 onward. The decline in both categories after 2020 may reflect broader industry shifts or impacts, potentially due to the global pandemic.</small>", unsafe_allow_html=True)
-        
-        st.divider()
+    st.divider()
 
-         # Plot : Movies released by year
-        movies = df[df['type'] == 'Movie']
-        tv_shows = df[df['type'] == 'TV Show']
-
-        movies_release_year_counts = movies['release_year'].value_counts().sort_index()
-        tv_shows_release_year_counts = tv_shows['release_year'].value_counts().sort_index()
-
-        # Create a Plotly figure
-        fig4 = go.Figure()
-
-        color_scale = px.colors.sequential.Viridis
-         # Treemap for Movies
-        top_10_countries = movies['country'].value_counts().nlargest(10).reset_index()
-        top_10_countries.columns = ['country', 'count'] 
-        fig_treemap = px.treemap(top_10_countries, path=['country'], values='count',
-                                title='Top 10 Countries by Number of Movies Produced (2005-2021)',
-                                color='count',
-                                color_continuous_scale=color_scale)
-
-        st.plotly_chart(fig_treemap)
-
-        st.markdown("<i><small>📈 **Figure 2**: This **treemap** visualization highlights the **Top 10 Countries** by Number of **Movies Produced** from **2005 to 2021** on Netflix. </small></i>", unsafe_allow_html=True)
-        st.markdown("<small><b>United States:</b> Leading the global movie production with 2001 titles, the U.S. dominates the chart, significantly outpacing other countries.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>United Kingdom and Canada:</b> These countries follow, but with much smaller contributions compared to the U.S., showing moderate movie production in the period.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>France, Nigeria, and Egypt:</b> These countries also make notable contributions, with a sizable share of Netflix movie releases.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>Spain, Mexico, and Indonesia:</b> These countries contribute fewer movies, rounding out the list of top 10 movie-producing countries.</small>", unsafe_allow_html=True)
-
-         # Treemap for TV Shows 
-        top_10_countries = tv_shows['country'].value_counts().nlargest(10).reset_index()
-        top_10_countries.columns = ['country', 'count'] 
-        fig_treemap = px.treemap(top_10_countries, path=['country'], values='count',
-                                title='Top 10 Countries by Number of TV Shows Produced (2005-2021)',
-                                color='count',
-                                color_continuous_scale=px.colors.sequential.Plasma[::-1])
-
-        st.plotly_chart(fig_treemap)
-
-        st.markdown("<i><small>📈 **Figure 3**: This **treemap visualization** highlights the **Top 10 Countries** by Number of **TV Shows Produced** from **2005 to 2021** on Netflix. Key insights include: </small></i>", unsafe_allow_html=True)
-        st.markdown("<small><b>United States:</b> The U.S. leads significantly with 806 TV shows, making it the dominant country in Netflix's TV show production.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>United Kingdom:</b> These countries follow, with 238 TV shows, making it second on the list.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>Japan and South Korea:</b> Following the U.K., Japan produced 163 TV shows, while South Korea contributed 164 TV shows, showcasing a strong presence in the Asian entertainment industry.</small>", unsafe_allow_html=True)
-        st.markdown("<small><b>Canada, India, France, Australia, Taiwan, and Spain:</b> These countries also made notable contributions, with varying levels of production but still placing within the top 10.</small>", unsafe_allow_html=True)
-        
-        st.divider()
+     # Treemap for Movies
+    st.plotly_chart(dashboard_chart('movie_countries'))
 
-        # Plot: Distribution of Top Genres : Movies
-        country_genre_counts = movies.groupby(['country', 'listed_in']).size().unstack(fill_value=0)
-        top_countries = country_genre_counts.sum(axis=1).sort_values(ascending=False).head(10).index
-        top_country_genre = country_genre_counts.loc[top_countries]
-        top_genres = top_country_genre.sum().sort_values(ascending=False).head(10).index
-
-        top_country_genre = top_country_genre[top_genres]
-        fig6 = go.Figure()
-
-        # Loop through each genre to add a trace to the figure
-        for genre in top_country_genre.columns:
-            fig6.add_trace(go.Bar(
-                x=top_country_genre.index,
-                y=top_country_genre[genre],
-                name=genre,
-                hoverinfo='y+name',
-            ))
-
-        # Update layout for the stacked bar chart
-        fig6.update_layout(
-            title='Distribution of Top Genres on Movies in Top 10 Countries (2005-2021)',
-            xaxis_title='Country',
-            yaxis_title='Number of Movies',
-            barmode='stack',
-            legend_title='Genre',
-            template='plotly'
-        )
-
-        # Display the plot in Streamlit
-        st.plotly_chart(fig6)
-        st.markdown("<i><small>📊 **Figure 4**: This stacked bar chart highlights the **Top Genres** in the **Top 10 Countries** for Netflix movies. </small></i>", unsafe_allow_html=True)
-        st.markdown("<small>The US dominates with **Documentaries** (265) and **Stand-Up Comedy** (196), showcasing a strong focus on factual and comedic content. **India** leans toward a mix of **Comedies, Dramas, and International Movies**, reflecting its diverse storytelling preferences. The **UK** favors **Documentaries**, while **Canada** balances **family-friendly comedies** and **Documentaries**. **France** highlights a preference for **Dramas** and **International Movies**, indicating a taste for emotionally rich and globally diverse content. Each country's top genres reflect its unique cultural and entertainment priorities.</small>", unsafe_allow_html=True)
-
-        # Plot: Distribution of Top Genres : TV Shows 
-        country_genre_counts = tv_shows.groupby(['country', 'listed_in']).size().unstack(fill_value=0)
-        top_countries = country_genre_counts.sum(axis=1).sort_values(ascending=False).head(10).index
-        top_country_genre = country_genre_counts.loc[top_countries]
-        top_genres = top_country_genre.sum().sort_values(ascending=False).head(10).index
-
-        top_country_genre = top_country_genre[top_genres]
-        fig7 = go.Figure()
-
-        # Loop through each genre to add a trace to the figure
-        for genre in top_country_genre.columns:
-            fig7.add_trace(go.Bar(
-                x=top_country_genre.index,
-                y=top_country_genre[genre],
-                name=genre,
-                hoverinfo='y+name',
-            ))
-
-        # Update layout for the stacked bar chart
-        fig7.update_layout(
-            title='Distribution of Top Genres on TV Shows in Top 10 Countries (2005-2021)',
-            xaxis_title='Country',
-            yaxis_title='Number of TV Shows',
-            barmode='stack',  # Set barmode to stack
-            legend_title='Genre',
-            template='plotly'
-        )
-
-            # Display the plot in Streamlit
-        st.plotly_chart(fig7)
-        st.markdown("<i><small>📊 **Figure 5**: This stacked bar chart presents the **Top Genres** in selected countries for Netflix TV shows.</small></i>", unsafe_allow_html=True)
-        st.markdown("<small>The **US** leads with a significant preference for **Kid's TV** (93), showing a strong demand for child-friendly content, followed by **Reality TV** (72), and both **Docuseries** and **TV Comedies** (60 each). **South Korea** emphasizes a mix of **International, Korean, and Romantic TV Shows** (63), reflecting its global influence and local storytelling. **Japan** stands out with a strong affinity for **Anime** and **International TV Shows** (71), indicating the popularity of animated content and cross-border entertainment.</small>", unsafe_allow_html=True)
+    st.markdown("<i><small>📈 **Figure 2**: This **treemap** visualization highlights the **Top 10 Countries** by Number of **Movies Produced** from **2005 to 2021** on Netflix. </small></i>", unsafe_allow_html=True)
+    st.markdown("<small><b>United States:</b> Leading the global movie production with 2001 titles, the U.S. dominates the chart, significantly outpacing other countries.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>United Kingdom and Canada:</b> These countries follow, but with much smaller contributions compared to the U.S., showing moderate movie production in the period.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>France, Nigeria, and Egypt:</b> These countries also make notable contributions, with a sizable share of Netflix movie releases.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>Spain, Mexico, and Indonesia:</b> These countries contribute fewer movies, rounding out the list of top 10 movie-producing countries.</small>", unsafe_allow_html=True)
 
-        st.divider()
+     # Treemap for TV Shows 
+    st.plotly_chart(dashboard_chart('tv_show_countries'))
 
-          # Plot : Distribution of ratings
-        rating_count = df['rating'].value_counts().reset_index()
-        rating_count.columns = ['rating', 'count']
-        fig2 = px.pie(rating_count, values='count', names='rating', title="Distribution of Netflix Ratings")
-        st.plotly_chart(fig2)
+    st.markdown("<i><small>📈 **Figure 3**: This **treemap visualization** highlights the **Top 10 Countries** by Number of **TV Shows Produced** from **2005 to 2021** on Netflix. Key insights include: </small></i>", unsafe_allow_html=True)
+    st.markdown("<small><b>United States:</b> The U.S. leads significantly with 806 TV shows, making it the dominant country in Netflix's TV show production.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>United Kingdom:</b> These countries follow, with 238 TV shows, making it second on the list.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>Japan and South Korea:</b> Following the U.K., Japan produced 163 TV shows, while South Korea contributed 164 TV shows, showcasing a strong presence in the Asian entertainment industry.</small>", unsafe_allow_html=True)
+    st.markdown("<small><b>Canada, India, France, Australia, Taiwan, and Spain:</b> These countries also made notable contributions, with varying levels of production but still placing within the top 10.</small>", unsafe_allow_html=True)
+    
+    st.divider()
+
+    # Plot: Distribution of Top Genres : Movies
+    st.plotly_chart(dashboard_chart('movie_genres'))
+    st.markdown("<i><small>📊 **Figure 4**: This stacked bar chart highlights the **Top Genres** in the **Top 10 Countries** for Netflix movies. </small></i>", unsafe_allow_html=True)
+    st.markdown("<small>Titles listed under several genres count towards each of them. The **US** leads with **Dramas** (556) and **Comedies** (484), followed by **Documentaries** (432), showcasing a strong focus on both storytelling and factual content. **India** leans heavily toward **International Movies** (723) and **Dramas** (546), reflecting the size of its film industry. The **UK** favors **Dramas**, **International Movies** and **Documentaries**, while **Canada** balances **Comedies** and **family-friendly** titles. **France** and **Spain** highlight a preference for **International Movies** and **Dramas**, indicating a taste for emotionally rich and globally diverse content. Each country's top genres reflect its unique cultural and entertainment priorities.</small>", unsafe_allow_html=True)
+
+    # Plot: Distribution of Top Genres : TV Shows 
+    st.plotly_chart(dashboard_chart('tv_show_genres'))
+    st.markdown("<i><small>📊 **Figure 5**: This stacked bar chart presents the **Top Genres** in selected countries for Netflix TV shows.</small></i>", unsafe_allow_html=True)
+    st.markdown("<small>Titles listed under several genres count towards each of them. The **US** leads with **TV Comedies** (232) and **TV Dramas** (202), followed by **Docuseries** (176) and **Kids' TV** (172), showing a strong demand for both entertainment and child-friendly content. The **UK** stands out with **British TV Shows** (210). **South Korea** emphasizes **International** (151) and **Romantic TV Shows** (76), reflecting its global influence and local storytelling. **Japan** stands out with a strong affinity for **International TV Shows** (138) and **Anime** (125), indicating the popularity of animated content and cross-border entertainment.</small>", unsafe_allow_html=True)
+
+    st.divider()
 
-        st.markdown("<i><small>📊 **Figure 6**: This pie chart provides an overview of the **Distribution** of **Ratings** of both **TV-show and Movie** between **2005 and 2021**.</small></i>", unsafe_allow_html=True)
-        st.markdown("<small>The pie chart on Netflix ratings distribution reveals that TV-MA (Mature Audiences) dominates with 39.4% of all rated content, indicating that a significant portion of Netflix's content is tailored to adult viewers. TV-14, targeting teenagers, follows with 24.3%, reflecting a large amount of content for younger audiences as well. TV-PG, at 9.7%, and R-rated content, at 8.62%, further contribute to the platform's adult-focused offerings. The presence of TV-Y (3.09%) and TV-Y7 (3.06%) shows Netflix's smaller but notable commitment to children’s programming. The lower percentages for PG (2.9%) and TV-G (2.48%) suggest that family-oriented content forms a smaller portion of the overall library. This data highlights Netflix’s emphasis on mature and teen audiences while maintaining a diverse range of content for different age groups.</small>", unsafe_allow_html=True)
+      # Plot : Distribution of ratings
+    st.plotly_chart(dashboard_chart('ratings'))
 
-    with AnalysisTab:
-        st.write("### Analysis",":clipboard:")
-        st.markdown(
+    st.markdown("<i><small>📊 **Figure 6**: This pie chart provides an overview of the **Distribution** of **Ratings** of both **TV-show and Movie** between **2005 and 2021**.</small></i>", unsafe_allow_html=True)
+    st.markdown("<small>The pie chart on Netflix ratings distribution reveals that TV-MA (Mature Audiences) dominates with 39.4% of all rated content, indicating that a significant portion of Netflix's content is tailored to adult viewers. TV-14, targeting teenagers, follows with 24.3%, reflecting a large amount of content for younger audiences as well. TV-PG, at 9.7%, and R-rated content, at 8.62%, further contribute to the platform's adult-focused offerings. The presence of TV-Y (3.09%) and TV-Y7 (3.06%) shows Netflix's smaller but notable commitment to children’s programming. The lower percentages for PG (2.9%) and TV-G (2.48%) suggest that family-oriented content forms a smaller portion of the overall library. This data highlights Netflix’s emphasis on mature and teen audiences while maintaining a diverse range of content for different age groups.</small>", unsafe_allow_html=True)
+
+
+# Analysis tab
+def analysis_page():
+    st.write("### Analysis",":clipboard:")
+    st.markdown(
     '''
     <p class="text-conclusion">
-        The <strong>analysis</strong> of the <strong>Netflix Dataset</strong> reveals significant trends in content production, highlighting a <strong>steady increase</strong> in movie and TV show releases after <strong>2000</strong>, likely due to the growth of the streaming industry and technological advancements making content more accessible. There is also a <strong>notable surge</strong> in releases around <strong>2014-2015</strong>, possibly due to Netflix's global expansion and its shift towards producing original content. The <strong>trend peaks</strong> for <strong>TV shows</strong> around <strong>2017-2018</strong> and for <strong>movies</strong> around <strong>2019-2020</strong> before a noticeable decline in mid-2020, likely influenced by external factors such as <strong>the pandemic</strong>.
+    The <strong>analysis</strong> of the <strong>Netflix Dataset</strong> reveals significant trends in content production, highlighting a <strong>steady increase</strong> in movie and TV show releases after <strong>2000</strong>, likely due to the growth of the streaming industry and technological advancements making content more accessible. There is also a <strong>notable surge</strong> in releases around <strong>2014-2015</strong>, possibly due to Netflix's global expansion and its shift towards producing original content. The <strong>trend peaks</strong> for <strong>TV shows</strong> around <strong>2017-2018</strong> and for <strong>movies</strong> around <strong>2019-2020</strong> before a noticeable decline in mid-2020, likely influenced by external factors such as <strong>the pandemic</strong>.
     <p class="text-conclusion">
-        The data shows that the <strong>United State</strong> is the <strong>largest contributor</strong> to Netflix's content library overall, which is likely due to Netflix being a U.S.-based company with deep ties to Hollywood and the American entertainment industry. For <strong>TV shows</strong>, <strong>the United States, United Kingdom, and South Korea</strong> are the dominant contributors. This may be attributed to the popularity of American and British TV production, which has long dominated global entertainment, and the rise of South Korean dramas, or “K-dramas,” which have gained massive international followings thanks to their unique storytelling and Netflix's strategic focus on Asian markets. In contrast, <strong>for movies</strong>, <strong>the United States, India, and the United Kingdom</strong> lead the contributions. The dominance of the U.S. in movies can also be linked to Hollywood's global reach, while India's Bollywood industry is one of the largest film industries in the world, known for producing a vast number of films each year. The UK's inclusion in both TV and movie production reflects its historical influence and the continued global appeal of British entertainment.
+    The data shows that the <strong>United State</strong> is the <strong>largest contributor</strong> to Netflix's content library overall, which is likely due to Netflix being a U.S.-based company with deep ties to Hollywood and the American entertainment industry. For <strong>TV shows</strong>, <strong>the United States, United Kingdom, and South Korea</strong> are the dominant contributors. This may be attributed to the popularity of American and British TV production, which has long dominated global entertainment, and the rise of South Korean dramas, or “K-dramas,” which have gained massive international followings thanks to their unique storytelling and Netflix's strategic focus on Asian markets. In contrast, <strong>for movies</strong>, <strong>the United States, India, and the United Kingdom</strong> lead the contributions. The dominance of the U.S. in movies can also be linked to Hollywood's global reach, while India's Bollywood industry is one of the largest film industries in the world, known for producing a vast number of films each year. The UK's inclusion in both TV and movie production reflects its historical influence and the continued global appeal of British entertainment.
     </p>
     <p class="text-conclusion">
-        Additionally, genre dominance patterns in Netflix’s content library illustrate its diverse offerings. For <strong>movies</strong>, <strong>documentaries, stand-up comedy, and international dramas</strong> are the most prevalent genres, reflecting Netflix's strategy of offering a diverse range of content to appeal to various audience interests globally. In the case of <strong>TV shows</strong>, <strong>kid’s TV, reality TV, and international (particularly Korean romantic)</strong> shows dominate. The popularity of kid’s and reality TV aligns with Netflix’s efforts to cater to family and entertainment-oriented audiences, while the strong presence of Korean romantic shows highlights the global surge in demand for K-dramas.
+    Additionally, genre dominance patterns in Netflix’s content library illustrate its diverse offerings. For <strong>movies</strong>, <strong>international movies, dramas and comedies</strong> are the most prevalent genres, followed by documentaries, reflecting Netflix's strategy of offering a diverse range of content to appeal to various audience interests globally. In the case of <strong>TV shows</strong>, <strong>international TV shows, TV dramas and TV comedies</strong> dominate, with crime shows, kid’s TV and docuseries close behind. The strength of kid’s TV aligns with Netflix’s efforts to cater to family audiences, while the many international and romantic TV shows, led by South Korea, highlight the global surge in demand for K-dramas.
     </p>
     <p class="text-conclusion">
-        Moreover, <strong>the dominant rating</strong> across Netflix's content is <strong>TV-MA</strong>, with <strong>TV shows</strong> most frequently rated as <strong>TV-MA</strong> and <strong>movies</strong> often rated as <strong>R</strong>. This trend suggests that Netflix <strong>targets a mature audience</strong>, possibly to align with global viewing preferences and to capture the interest of a demographic that engages more frequently with mature-themed content, which can attract both viewership and subscriber retention.
+    Moreover, <strong>the dominant rating</strong> across Netflix's content is <strong>TV-MA</strong>, with <strong>TV shows</strong> most frequently rated as <strong>TV-MA</strong> and <strong>movies</strong> often rated as <strong>R</strong>. This trend suggests that Netflix <strong>targets a mature audience</strong>, possibly to align with global viewing preferences and to capture the interest of a demographic that engages more frequently with mature-themed content, which can attract both viewership and subscriber retention.
     </p>
     <p class="text-conclusion">
-        Visualizations such as <strong>line plots, bar charts and tree maps</strong> effectively illustrate this growth and genre diversity, underscoring Netflix's strategic focus on expanding its offerings to <strong>engage a global audience</strong>. As the platform continues to navigate the competitive streaming landscape, understanding these trends will be crucial for <strong>future content development and audience targeting.</strong>
+    Visualizations such as <strong>line plots, bar charts and tree maps</strong> effectively illustrate this growth and genre diversity, underscoring Netflix's strategic focus on expanding its offerings to <strong>engage a global audience</strong>. As the platform continues to navigate the competitive streaming landscape, understanding these trends will be crucial for <strong>future content development and audience targeting.</strong>
     </p>
     ''',
     unsafe_allow_html=True
 )
+
+
+# Each section is its own page, so only the one being viewed does any work
+page = st.navigation([
+    st.Page(overview_page, title="Dataset Overview", url_path="overview", default=True),
+    st.Page(dashboard_page, title="Data Visualization", url_path="dashboard"),
+    st.Page(analysis_page, title="Analysis", url_path="analysis"),
+    # Only reachable at /diagnostics, see diagnostics.py
+    st.Page(diagnostics_page, title="Diagnostics", url_path="diagnostics", visibility="hidden"),
+], position="top")
+# The filters are only drawn on the data pages, each with widgets of its
+# own; keep the selection when switching pages
+keep_filters()
+with measure(f"page:{page.title}"):
+    page.run()
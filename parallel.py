@@ -0,0 +1,80 @@
+"""Encoding and counting of large catalogs on several cores.
+
+Encoding the catalog (splitting the genre and full country lists and
+interning their values, see ``codes.py``) is most of the work behind the
+count cube.
+For large catalogs the cleaned titles are split into shards of consecutive
+rows, each shard is encoded and counted by a worker process, and the
+partial results are merged in shard order.  Merging appends new values in
+shard order, which keeps the order of first appearance of the whole
+catalog, so rankings and ties come out as with the serial path.
+
+Below ``MIN_PARALLEL_ROWS`` titles, or with a single worker, starting
+processes and shipping the shards costs more than it saves and everything
+runs in-process instead.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+
+from codes import CatalogCodes
+from instrumentation import instrumented
+from netflix_data import CHART_COLUMNS
+
+# Catalogs smaller than this are encoded and counted in-process
+MIN_PARALLEL_ROWS = 500_000
+
+# Shards per worker, so that a slow shard does not hold up the others
+SHARDS_PER_WORKER = 2
+
+
+def default_workers():
+    """Number of cores this process may use."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def shard_bounds(n_rows, n_shards):
+    """Start and stop of ``n_shards`` consecutive, nearly equal shards of ``n_rows`` rows."""
+    edges = np.linspace(0, n_rows, n_shards + 1).astype(int)
+    return [(start, stop) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+
+def _executor(workers):
+    # Forking a process that runs threads (like the Streamlit server) is
+    # unsafe, so workers come from a fork server, or are spawned where
+    # there is none
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Imported once by the fork server instead of by every worker
+        context.set_forkserver_preload(['aggregates'])
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(workers, mp_context=context)
+
+
+@instrumented('map_shards')
+def map_shards(function, titles, workers=None, shards=None, min_rows=MIN_PARALLEL_ROWS):
+    """Apply ``function`` to consecutive shards of ``titles`` in a process pool.
+
+    ``workers`` defaults to the number of usable cores and ``shards`` to
+    ``SHARDS_PER_WORKER`` per worker.  Returns the results in shard order;
+    catalogs under ``min_rows`` titles make a single shard processed
+    in-process.
+    """
+    workers = workers or default_workers()
+    if workers == 1 or len(titles) < min_rows:
+        return [function(titles)]
+    titles = titles[CHART_COLUMNS]
+    parts = [titles.iloc[start:stop] for start, stop in shard_bounds(len(titles), shards or workers * SHARDS_PER_WORKER)]
+    with _executor(workers) as pool:
+        return list(pool.map(function, parts))
+
+
+def parallel_codes(titles, **options):
+    """Integer codes of the cleaned ``titles``, encoded shard by shard (see ``map_shards``)."""
+    return reduce(CatalogCodes.append, map_shards(CatalogCodes.from_titles, titles, **options))
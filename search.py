@@ -0,0 +1,268 @@
+"""Full-text search over title, cast, director and description.
+
+Text is case-folded and split into word tokens, and an inverted index maps
+each token to the titles containing it (CSR style ``offsets``/``docs``
+arrays, with a field-weighted term frequency per posting).  Tokens are kept
+sorted so the last word of a query can be prefix-matched while it is typed.
+
+The index is built once per dataset version and saved next to the CSV, so
+other workers load it instead of rebuilding it.  Ingested deltas get an
+index segment of their own until they are compacted.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import instrumented
+from netflix_data import DATA_PATH, dataset_version, delta_segments, load_base, previous_state, save_state
+from snapshot import compact_path, read_snapshot, segment_path
+
+# Bump when tokenizing or scoring changes so old index files are rebuilt
+SEARCH_FORMAT = 1
+
+# Searched columns and how much a match in each of them counts
+FIELD_WEIGHTS = {'title': 4.0, 'director': 2.0, 'cast': 2.0, 'description': 1.0}
+
+TOKEN_PATTERN = r'\w+'
+
+# Titles tokenized at once when building an index
+SEARCH_CHUNK_SIZE = 20_000
+
+# Sorts after every token sharing a prefix, for prefix range lookups
+_PREFIX_END = '\U0010ffff'
+
+
+def tokenize(text):
+    """Split ``text`` into case-folded word tokens."""
+    return re.findall(TOKEN_PATTERN, text.casefold())
+
+
+def index_path(source_path):
+    """Return the index file used for ``source_path``."""
+    return os.path.splitext(source_path)[0] + '.search.npz'
+
+
+class SearchIndex:
+    """Inverted index of the searchable text columns of a catalog."""
+
+    def __init__(self, n_docs, vocabulary, offsets, docs, weights):
+        self.n_docs = n_docs
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        doc_counts = np.diff(offsets)
+        self.idf = np.log1p(n_docs / np.maximum(doc_counts, 1)).astype(np.float32)
+
+    @classmethod
+    def from_titles(cls, titles, chunk_size=SEARCH_CHUNK_SIZE):
+        # Postings are built a chunk of titles at a time and then merged,
+        # so only one chunk's tokens are held as Python strings at once
+        n_docs = len(titles)
+        chunks = [_chunk_postings(titles.iloc[start:start + chunk_size], start)
+                  for start in range(0, n_docs, chunk_size)]
+        if not chunks:
+            return cls(0, np.array([], dtype=object), np.zeros(1, dtype=np.int64),
+                       np.array([], dtype=np.int32), np.array([], dtype=np.float32))
+        vocabulary = np.unique(np.concatenate([chunk_vocabulary for chunk_vocabulary, _, _, _ in chunks]))
+        term_ids = np.concatenate([
+            np.searchsorted(vocabulary, chunk_vocabulary).astype(np.int32)[chunk_terms]
+            for chunk_vocabulary, chunk_terms, _, _ in chunks
+        ])
+        # Each chunk is ordered by term then doc and the chunks by doc, so a
+        # stable sort on the term keeps the docs of every term in order
+        order = np.argsort(term_ids, kind='stable')
+        docs = np.concatenate([chunk_docs for _, _, chunk_docs, _ in chunks])[order]
+        weights = np.concatenate([chunk_weights for _, _, _, chunk_weights in chunks])[order]
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(n_docs, vocabulary, offsets, docs, weights)
+
+    def save(self, path, tag):
+        # Tokens are stored as one NUL separated string to keep the file compact
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp_path,
+            tag=np.array(tag),
+            n_docs=np.array(self.n_docs),
+            vocabulary=np.frombuffer('\0'.join(self.vocabulary).encode(), dtype=np.uint8),
+            offsets=self.offsets,
+            docs=self.docs,
+            weights=self.weights,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, tag):
+        """Load the index at ``path``, or return ``None`` if it is missing or stale."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data['tag']) != tag:
+                    return None
+                text = data['vocabulary'].tobytes().decode()
+                vocabulary = text.split('\0') if text else []
+                return cls(int(data['n_docs']), np.asarray(vocabulary, dtype=object),
+                           data['offsets'], data['docs'], data['weights'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _term_range(self, token, prefix):
+        start = np.searchsorted(self.vocabulary, token, side='left')
+        if prefix:
+            stop = np.searchsorted(self.vocabulary, token + _PREFIX_END, side='left')
+        else:
+            stop = start + int(start < len(self.vocabulary) and self.vocabulary[start] == token)
+        return start, stop
+
+    def scores(self, query):
+        """Relevance of every title for ``query`` (0 for titles that don't match).
+
+        Every word of the query must match; the last one also matches as a
+        prefix.  Returns ``None`` for a query without any word.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        total = np.zeros(self.n_docs, dtype=np.float32)
+        matched = np.ones(self.n_docs, dtype=bool)
+        for position, token in enumerate(tokens):
+            start, stop = self._term_range(token, prefix=position == len(tokens) - 1)
+            first, last = self.offsets[start], self.offsets[stop]
+            idf = np.repeat(self.idf[start:stop], np.diff(self.offsets[start:stop + 1]))
+            token_scores = np.bincount(self.docs[first:last], weights=self.weights[first:last] * idf,
+                                       minlength=self.n_docs)
+            matched &= token_scores > 0
+            total += token_scores
+        total[~matched] = 0
+        return total
+
+    def search(self, query, limit=20):
+        """Positions of the ``limit`` best matching titles, best first."""
+        return _search(self.scores(query), limit)
+
+    def match_rows(self, query):
+        """Boolean mask of the titles matching ``query`` (``None`` for an empty query)."""
+        return _match_rows(self.scores(query))
+
+
+class SegmentedSearchIndex:
+    """Search indexes of consecutive runs of titles, queried as one.
+
+    The catalog snapshot gets one segment and each ingested delta another,
+    so a delta only has its own titles indexed.  Each segment weighs
+    tokens by its own document frequencies.
+    """
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.n_docs = sum(segment.n_docs for segment in segments)
+
+    def extend(self, segment):
+        """Return the index with ``segment`` indexing the titles after these."""
+        return SegmentedSearchIndex(self.segments + [segment])
+
+    def scores(self, query):
+        """Relevance of every title for ``query``, see ``SearchIndex.scores``."""
+        scores = [segment.scores(query) for segment in self.segments]
+        return None if scores[0] is None else np.concatenate(scores)
+
+    @instrumented('search')
+    def search(self, query, limit=20):
+        return _search(self.scores(query), limit)
+
+    def match_rows(self, query):
+        return _match_rows(self.scores(query))
+
+
+def _chunk_postings(titles, start):
+    """Vocabulary and (term, doc, weight) postings of a chunk of titles.
+
+    There is one posting per token and title, ordered by term then doc;
+    docs are numbered from ``start``.
+    """
+    frames = []
+    for field, weight in FIELD_WEIGHTS.items():
+        values = titles[field].reset_index(drop=True).astype('string').fillna('')
+        tokens = values.str.casefold().str.findall(TOKEN_PATTERN).explode().dropna()
+        frames.append(pd.DataFrame({
+            'doc': tokens.index.to_numpy(np.int64),
+            'term': tokens.to_numpy(object),
+            'weight': np.full(len(tokens), weight),
+        }))
+    postings = pd.concat(frames, ignore_index=True)
+
+    term_ids, vocabulary = pd.factorize(postings['term'], sort=True)
+    n_docs = len(titles)
+    keys, inverse = np.unique(term_ids.astype(np.int64) * n_docs + postings['doc'].to_numpy(), return_inverse=True)
+    weights = np.bincount(inverse, weights=postings['weight'].to_numpy()).astype(np.float32)
+    docs = (keys % n_docs + start).astype(np.int32)
+    return np.asarray(vocabulary, dtype=object), keys // n_docs, docs, weights
+
+
+def _search(scores, limit):
+    if scores is None:
+        return np.array([], dtype=np.int64)
+    hits = np.flatnonzero(scores)
+    if len(hits) > limit:
+        hits = hits[np.argpartition(-scores[hits], limit)[:limit]]
+    return hits[np.argsort(-scores[hits], kind='stable')]
+
+
+def _match_rows(scores):
+    return None if scores is None else scores > 0
+
+
+def _tag(source_version, number):
+    return json.dumps({'format': SEARCH_FORMAT, 'source': list(source_version), 'segment': number})
+
+
+def _base_index_path(path, compacted):
+    return index_path(path) if compacted == 0 else compact_path(path, compacted, 'search.npz')
+
+
+def save_base_index(titles, path, source_version, compacted):
+    """Index ``titles``, the snapshot of ``path`` compacted up to delta ``compacted``, ahead of loading it."""
+    SearchIndex.from_titles(titles).save(_base_index_path(path, compacted), _tag(source_version, compacted))
+
+
+def _load_segment_index(target, tag, load):
+    segment = SearchIndex.load(target, tag)
+    if segment is None:
+        segment = SearchIndex.from_titles(load(list(FIELD_WEIGHTS)))
+        segment.save(target, tag)
+    return segment
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('search_index')
+def _load_search_index(path, version):
+    key = ('search_index', path)
+    start, index = previous_state(key, version)
+    source_version, _, compacted = version
+    if index is None:
+        start = compacted
+        target = _base_index_path(path, compacted)
+        index = SegmentedSearchIndex([
+            _load_segment_index(target, _tag(source_version, compacted), lambda columns: load_base(path, version, columns))
+        ])
+    for number, segment in delta_segments(path, version, start):
+        # Deltas without titles after cleaning have no segment
+        if segment['clean_rows']:
+            index = index.extend(_load_segment_index(
+                segment_path(path, number, 'search.npz'), _tag(source_version, number),
+                lambda columns: read_snapshot(segment_path(path, number), columns)))
+    save_state(key, version, index)
+    return index
+
+
+def load_search_index(path=DATA_PATH, version=None):
+    """Return the search index of the cleaned catalog at ``path``.
+
+    Each segment of the index is read from disk when an up to date copy
+    exists and built and saved otherwise.
+    """
+    return _load_search_index(path, version or dataset_version(path))
@@ -0,0 +1,111 @@
+"""Columnar on-disk snapshot of the cleaned catalog.
+
+The cleaned frame is stored as Parquet next to the CSV it was built from,
+tagged with the CSV's fingerprint.  Workers read it memory-mapped and only
+decode the columns they ask for, so charts never touch ``cast`` or
+``description``.  Catalog updates ingested with ``ingest.py`` are stored
+the same way, one delta segment per update, listed in a journal, and
+every few updates compacted into a new snapshot.
+"""
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrumentation import instrumented
+
+# Bump when the cleaning rules change so old snapshots are rebuilt
+SNAPSHOT_FORMAT = 4
+
+_METADATA_KEY = b'netflix_snapshot'
+
+
+def snapshot_path(source_path):
+    """Return the snapshot file used for ``source_path``."""
+    return os.path.splitext(source_path)[0] + '.parquet'
+
+
+def segment_path(source_path, number, suffix='parquet'):
+    """Return the file of delta segment ``number`` of ``source_path``."""
+    return f'{os.path.splitext(source_path)[0]}.delta-{number:05d}.{suffix}'
+
+
+def compact_path(source_path, number, suffix='parquet'):
+    """Return the file of the snapshot of ``source_path`` compacted up to delta segment ``number``."""
+    return f'{os.path.splitext(source_path)[0]}.compact-{number:05d}.{suffix}'
+
+
+def journal_path(source_path):
+    """Return the journal listing the delta segments of ``source_path``."""
+    return os.path.splitext(source_path)[0] + '.journal.json'
+
+
+def _tag(source_version):
+    return json.dumps({'format': SNAPSHOT_FORMAT, 'source': list(source_version)}).encode()
+
+
+def is_current(path, source_version):
+    """Tell whether the snapshot at ``path`` was built from ``source_version``."""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return metadata.get(_METADATA_KEY) == _tag(source_version)
+
+
+def _chunk_schema(table, source_version):
+    # Chunks have categories of their own; a wide index type lets every
+    # chunk's dictionary fit, and readers merge them in chunk order
+    fields = [
+        field.with_type(pa.dictionary(pa.int32(), field.type.value_type)) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ]
+    metadata = dict(table.schema.metadata or {})
+    metadata[_METADATA_KEY] = _tag(source_version)
+    return pa.schema(fields, metadata=metadata)
+
+
+@instrumented('write_snapshot')
+def write_snapshot_chunks(chunks, path, source_version):
+    """Write the frames ``chunks`` one after the other to ``path`` atomically, tagged with ``source_version``.
+
+    Only one chunk is held at a time.  Categorical columns may have
+    different categories in each chunk; read back, their categories come
+    in order of first appearance over all chunks.
+    """
+    # Write to a private file first so concurrent readers never see a
+    # half-written snapshot
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            if writer is None:
+                schema = _chunk_schema(table, source_version)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            if len(df):
+                writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(df, path, source_version):
+    """Write ``df`` to ``path`` atomically, tagged with ``source_version``."""
+    write_snapshot_chunks([df], path, source_version)
+
+
+def snapshot_columns(path):
+    """Names of the columns of the snapshot at ``path``, without its index."""
+    metadata = pq.read_schema(path).pandas_metadata
+    return [column['name'] for column in metadata['columns'] if column['field_name'] not in metadata['index_columns']]
+
+
+@instrumented('read_snapshot')
+def read_snapshot(path, columns=None):
+    """Read ``columns`` (all when ``None``) of the snapshot at ``path``."""
+    # The pandas metadata brings the index along when only some columns are read
+    table = pq.read_table(path, columns=columns, memory_map=True, use_pandas_metadata=True)
+    return table.to_pandas()
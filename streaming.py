@@ -0,0 +1,61 @@
+"""Dashboard aggregates of catalogs too large to load at once.
+
+The CSV is parsed a chunk of rows at a time, reading only the columns the
+cleaning rules and the charts need (never ``cast`` or ``description``).
+Each chunk is cleaned, reduced to its count cube (see ``aggregates.py``)
+and added to the running total, so memory stays bounded by the chunk size
+plus the cube whatever the size of the file.  Chunks are merged in file
+order, keeping categories in order of first appearance, so the cube is the
+same as the one built from the whole catalog in memory.
+
+Usage::
+
+    python streaming.py catalog.csv --chunk-size 100000 --output cube.json
+"""
+import argparse
+import json
+import sys
+
+import plotly.io as pio
+
+from aggregates import CountCube
+from charts import DASHBOARD_CHARTS
+from instrumentation import instrumented
+from netflix_data import DATA_PATH, REQUIRED_COLUMNS, clean_titles, read_title_chunks
+
+# Everything clean_titles() and the count cube look at
+STREAM_COLUMNS = REQUIRED_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+@instrumented('stream_cube')
+def stream_cube(path=DATA_PATH, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Build the count cube of the catalog at ``path`` one chunk at a time."""
+    cube = None
+    for chunk in read_title_chunks(path, STREAM_COLUMNS, chunk_size):
+        chunk_cube = CountCube.from_titles(clean_titles(chunk))
+        cube = chunk_cube if cube is None else CountCube.merge([cube, chunk_cube])
+    return cube
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', nargs='?', default=DATA_PATH, help='catalog CSV to summarize')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows parsed at a time')
+    parser.add_argument('--output', help='write the dashboard figures as JSON to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    cube = stream_cube(args.path, args.chunk_size)
+    print(f'{args.path}: {cube.total()} titles after cleaning', file=sys.stderr)
+    figures = {chart_id: json.loads(pio.to_json(build(cube), validate=False))
+               for chart_id, build in DASHBOARD_CHARTS.items()}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(figures, file)
+    else:
+        json.dump(figures, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
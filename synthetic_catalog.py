@@ -0,0 +1,73 @@
+"""Synthetic catalogs with the schema of netflix_titles.csv, for benchmarks.
+
+Values are resampled from the bundled catalog so that value distributions,
+missing value rates and text lengths stay realistic.  Columns that depend
+on each other (a TV Show has seasons and TV genres) are sampled together
+from the same source row.
+
+Usage::
+
+    python synthetic_catalog.py 1000000 catalog_1m.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from netflix_data import DATA_PATH
+
+# Columns taken together from one source row
+JOINT_COLUMNS = ['type', 'release_year', 'rating', 'duration', 'listed_in']
+
+# Columns sampled independently of each other
+INDEPENDENT_COLUMNS = ['director', 'cast', 'country', 'date_added', 'description']
+
+COLUMNS = ['show_id', 'type', 'title', 'director', 'cast', 'country', 'date_added',
+           'release_year', 'rating', 'duration', 'listed_in', 'description']
+
+
+def generate_catalog(n_rows, seed=0, source=None, start=0):
+    """Return a synthetic catalog of ``n_rows`` titles.
+
+    ``source`` is the catalog to resample (the bundled CSV by default) and
+    ``start`` the number of the first generated title.
+    """
+    if source is None:
+        source = pd.read_csv(DATA_PATH, dtype=str, keep_default_na=True)
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(start, start + n_rows)
+
+    columns = {'show_id': pd.Series(numbers).map('s{}'.format).to_numpy(object)}
+    joint = rng.integers(0, len(source), n_rows)
+    for column in JOINT_COLUMNS:
+        columns[column] = source[column].to_numpy(object)[joint]
+    for column in INDEPENDENT_COLUMNS:
+        columns[column] = source[column].to_numpy(object)[rng.integers(0, len(source), n_rows)]
+
+    # Titles are made unique by appending the title number
+    titles = source['title'].to_numpy(object)[rng.integers(0, len(source), n_rows)]
+    columns['title'] = (pd.Series(titles) + ' ' + pd.Series(numbers).astype(str)).to_numpy(object)
+    return pd.DataFrame(columns)[COLUMNS]
+
+
+def write_catalog(path, n_rows, seed=0, chunk_size=1_000_000):
+    """Write a synthetic catalog of ``n_rows`` titles to the CSV ``path``.
+
+    Rows are generated and written ``chunk_size`` at a time so that large
+    catalogs never have to fit in memory.
+    """
+    source = pd.read_csv(DATA_PATH, dtype=str)
+    for chunk, start in enumerate(range(0, n_rows, chunk_size)):
+        rows = min(chunk_size, n_rows - start)
+        catalog = generate_catalog(rows, seed=seed + chunk, source=source, start=start + 1)
+        catalog.to_csv(path, mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', type=int, help='number of titles to generate')
+    parser.add_argument('path', help='CSV file to write')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_catalog(args.path, args.rows, seed=args.seed)
@@ -0,0 +1,110 @@
+"""Paged table views for the Dataset Overview tab.
+
+Instead of sending whole frames to the browser, only the visible page of
+rows is serialized.  Sorting happens on the server from a sort order that
+is computed once per dataset version and column, and ``describe()`` results
+are cached per dataset version and filter selection.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentation import instrumented
+from netflix_data import DATA_PATH, dataset_version, live_rows, load_titles
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+# Long text columns that are left out of the table unless asked for
+LONG_TEXT_COLUMNS = ['cast', 'description']
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+@instrumented('sort_order')
+def _sort_order(path, version, column, ascending):
+    values = load_titles(path, version=version)[column].reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Sort categories by name rather than by order of appearance
+        values = values.astype('string')
+    return values.sort_values(ascending=ascending, kind='stable').index.to_numpy()
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@instrumented('complete_rows')
+def _complete_rows(path, version):
+    complete = load_titles(path, version=version).notna().all(axis=1).to_numpy()
+    live = live_rows(path, version)
+    return complete if live is None else complete & live
+
+
+def complete_rows(path=DATA_PATH, version=None):
+    """Boolean mask of the current titles that have a value in every column."""
+    return _complete_rows(path, version or dataset_version(path))
+
+
+def combine_rows(*masks):
+    """AND together the boolean row masks that are not ``None``."""
+    masks = [mask for mask in masks if mask is not None]
+    if not masks:
+        return None
+    return np.logical_and.reduce(masks)
+
+
+def row_positions(n_rows, rows=None, order=None):
+    """Positions of the selected ``rows`` (all if ``None``), in ``order`` if given."""
+    if order is None:
+        return np.arange(n_rows) if rows is None else np.flatnonzero(rows)
+    return order if rows is None else order[rows[order]]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+@instrumented('describe')
+def _describe(_titles, _rows, key):
+    frame = _titles if _rows is None else _titles[_rows]
+    return frame.describe(include='number')
+
+
+def describe_rows(titles, rows, key, path=DATA_PATH, version=None):
+    """Return ``titles[rows].describe()``, cached per dataset version and ``key``.
+
+    ``key`` must identify ``rows``, e.g. the table name plus the filter
+    selection it was built from.  ``version`` must be the dataset version
+    ``titles`` was loaded at, the current one by default.
+    """
+    return _describe(titles, rows, (version or dataset_version(path), key))
+
+
+@instrumented('paged_table')
+def paged_table(titles, rows=None, key='table', path=DATA_PATH, version=None):
+    """Show one page of ``titles[rows]`` with column, sort and page controls.
+
+    ``version`` must be the dataset version ``titles`` was loaded at, the
+    current one by default.
+    """
+    all_columns = list(titles.columns)
+    default_columns = [column for column in all_columns if column not in LONG_TEXT_COLUMNS]
+
+    columns = st.multiselect('Columns', all_columns, default_columns, key=f'{key}_columns')
+    sort_control, order_control, size_control = st.columns(3)
+    sort_by = sort_control.selectbox(
+        'Sort by', [None] + all_columns, key=f'{key}_sort',
+        format_func=lambda column: 'Original order' if column is None else column,
+    )
+    descending = order_control.toggle('Descending', key=f'{key}_descending')
+    page_size = size_control.selectbox('Rows per page', PAGE_SIZES, key=f'{key}_page_size')
+
+    order = None
+    if sort_by is not None:
+        order = _sort_order(path, version or dataset_version(path), sort_by, not descending)
+    positions = row_positions(len(titles), rows, order)
+
+    n_pages = max(1, -(-len(positions) // page_size))
+    page_key = f'{key}_page'
+    # Keep the current page valid when a filter leaves fewer pages
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    page = st.number_input('Page', 1, n_pages, key=page_key)
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(positions))
+    st.dataframe(titles.iloc[positions[start:stop]][columns or all_columns])
+    st.caption(f'Page {page} of {n_pages}, rows {min(start + 1, stop)}-{stop} of {len(positions)}')
@@ -0,0 +1,57 @@
+"""Bitmap filters checked against filtering the cleaned catalog row by row."""
+import os
+
+import numpy as np
+
+from codes import CatalogCodes
+from filters import BitmapIndex
+from netflix_data import clean_titles, read_titles
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'netflix_titles.csv')
+
+SELECTIONS = [
+    {'type': ['Movie']},
+    {'release_year': (2015, 2017)},
+    {'release_year': (1800, 1900)},
+    {'country': ['India', 'Japan'], 'type': ['TV Show']},
+    {'genre': ['Dramas', 'Comedies'], 'release_year': (2010, 2021)},
+    {'genre': ['Brand New Genre']},
+    {'rating': ['XX', 'PG-13'], 'country': []},
+    {'rating': ['Not a rating']},
+]
+
+
+def naive_mask(titles, selection):
+    mask = np.ones(len(titles), dtype=bool)
+    for column, values in selection.items():
+        if column == 'release_year':
+            first, last = values
+            mask &= titles['release_year'].between(first, last).to_numpy()
+        elif column == 'genre' and values:
+            genres = titles['listed_in'].str.split(',').map(lambda genres: {genre.strip() for genre in genres})
+            mask &= genres.map(lambda genres: bool(genres & set(values))).to_numpy(bool)
+        elif values:
+            mask &= titles[column].isin(values).to_numpy()
+    return mask
+
+
+def test_select_matches_a_row_by_row_filter():
+    titles = clean_titles(read_titles(SOURCE)).reset_index(drop=True)
+    # Rows appended past a byte boundary, some with values the first rows don't have
+    split = 5003
+    rows = np.arange(len(titles))
+    titles = titles.assign(
+        listed_in=titles['listed_in'].astype(object).where((rows < split) | (rows % 3 != 0), 'Brand New Genre, Dramas'),
+        rating=titles['rating'].astype(object).where((rows < split) | (rows % 5 != 1), 'XX'),
+    )
+    head, tail = titles.iloc[:split], titles.iloc[split:]
+
+    full = BitmapIndex.from_codes(CatalogCodes.from_titles(titles))
+    extended = BitmapIndex.from_codes(CatalogCodes.from_titles(head)).extend(
+        CatalogCodes.from_titles(head).extend(tail))
+    assert full.n_rows == extended.n_rows == len(titles)
+    for index in [full, extended]:
+        assert index.select_mask({}) is None
+        assert index.select_mask({'country': [], 'release_year': None}) is None
+        for selection in SELECTIONS:
+            assert (index.select_mask(selection) == naive_mask(titles, selection)).all(), selection
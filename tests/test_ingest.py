@@ -0,0 +1,158 @@
+"""Deltas ingested with ingest.py, checked against rebuilding the catalog from scratch."""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import pytest
+import streamlit as st
+
+import aggregates
+import netflix_data
+from aggregates import CountCube, load_codes, load_cube
+from charts import DASHBOARD_CHARTS
+from filters import load_index, select_rows
+from ingest import compact, ingest_delta, read_journal
+from netflix_data import clean_titles, live_rows, load_titles, read_titles
+from search import load_search_index
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'netflix_titles.csv')
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = str(tmp_path / 'netflix_titles.csv')
+    shutil.copy(SOURCE, path)
+    return path
+
+
+@pytest.fixture
+def raw():
+    return read_titles(SOURCE)
+
+
+def write_delta(tmp_path, name, rows):
+    delta_path = str(tmp_path / name)
+    rows.to_csv(delta_path, index=False, date_format='%B %d, %Y')
+    return delta_path
+
+
+def forget_loaded():
+    """Make the next load start cold, like a new process."""
+    st.cache_resource.clear()
+    netflix_data._states.clear()
+
+
+def charts(cube):
+    return {chart_id: pio.to_json(build(cube), validate=False) for chart_id, build in DASHBOARD_CHARTS.items()}
+
+
+def current_titles(raw, deltas):
+    """The catalog rebuilt from the raw CSV with every delta applied as an upsert."""
+    titles = pd.concat([raw] + deltas).drop_duplicates('show_id', keep='last')
+    return clean_titles(titles)
+
+
+def test_delta_with_every_title_dropped(tmp_path, catalog, raw):
+    # Released before MIN_RELEASE_YEAR, so the new version of s1 is dropped
+    delta = raw[raw['show_id'] == 's1'].assign(release_year=1999)
+    segment = ingest_delta(write_delta(tmp_path, 'old.csv', delta), catalog)
+    assert segment['clean_rows'] == 0
+    assert not os.path.exists(str(tmp_path / 'netflix_titles.delta-00001.parquet'))
+
+    titles = load_titles(catalog)
+    live = live_rows(catalog)
+    assert not live[(titles['show_id'] == 's1').to_numpy()].any()
+    assert load_cube(catalog).total() == live.sum() == len(clean_titles(raw)) - 1
+    assert select_rows({'search': 'Dick Johnson'}, catalog) is not None
+    assert not select_rows({'search': 'Dick Johnson'}, catalog).any()
+
+    # A later delta still loads on top of the empty one
+    delta = raw[raw['show_id'] == 's1']
+    ingest_delta(write_delta(tmp_path, 'back.csv', delta), catalog)
+    assert load_cube(catalog).total() == len(clean_titles(raw))
+
+
+def test_many_deltas_load_cold(tmp_path, catalog, raw):
+    updates = raw[raw['show_id'].isin(['s1', 's2', 's3', 's4', 's5'])]
+    deltas = []
+    for number in range(200):
+        delta = updates.iloc[[number % len(updates)]].assign(title=f'Update {number}')
+        ingest_delta(write_delta(tmp_path, f'delta-{number}.csv', delta), catalog, compact_after=None)
+        deltas.append(delta)
+    assert len(read_journal(catalog)['segments']) == 200
+
+    forget_loaded()
+    expected = current_titles(raw, deltas)
+    assert load_cube(catalog).total() == len(expected)
+    assert load_index(catalog).n_rows == len(load_titles(catalog))
+    assert select_rows({'search': 'Update 199'}, catalog).sum() == 1
+    assert charts(load_cube(catalog)) == charts(CountCube.from_titles(expected))
+
+
+def test_warm_updates_and_compaction_match_a_rebuild(tmp_path, catalog, raw, monkeypatch):
+    load_cube(catalog)
+    # Updates, compaction included, start from what was built before
+    monkeypatch.setattr(aggregates, 'parallel_codes', None)
+    deltas = []
+    for number in range(5):
+        # New versions of existing titles, plus a new title
+        delta = raw.iloc[number * 7:number * 7 + 3].assign(rating='TV-MA')
+        new = raw.iloc[[number]].assign(show_id=f'new{number}', title=f'Newtitle{number}')
+        delta = pd.concat([delta, new])
+        ingest_delta(write_delta(tmp_path, f'delta-{number}.csv', delta), catalog, compact_after=4)
+        deltas.append(delta)
+        # Built from the previous version's state, apart from the compaction
+        warm = charts(load_cube(catalog))
+
+    journal = read_journal(catalog)
+    assert journal['compacted'] == 4
+
+    expected = current_titles(raw, deltas)
+    assert warm == charts(CountCube.from_titles(expected))
+    monkeypatch.undo()
+    forget_loaded()
+    assert charts(load_cube(catalog)) == warm
+
+    # Compacting again leaves only the current titles in the snapshot
+    assert compact(catalog) == 5
+    # The files of the version before are kept for processes still loading it
+    assert not os.path.exists(str(tmp_path / 'netflix_titles.delta-00001.parquet'))
+    assert os.path.exists(str(tmp_path / 'netflix_titles.delta-00005.parquet'))
+    assert os.path.exists(str(tmp_path / 'netflix_titles.compact-00004.parquet'))
+    assert os.path.exists(str(tmp_path / 'netflix_titles.compact-00005.search.npz'))
+    forget_loaded()
+    assert live_rows(catalog) is None
+    titles = load_titles(catalog)
+    assert sorted(titles['show_id']) == sorted(expected['show_id'])
+    assert charts(load_cube(catalog)) == warm
+    for number in range(5):
+        rows = select_rows({'search': f'newtitle{number}'}, catalog)
+        assert np.flatnonzero(rows).tolist() == np.flatnonzero(titles['show_id'] == f'new{number}').tolist()
+    assert load_search_index(catalog).n_docs == len(titles)
+
+
+def test_loaders_stay_on_the_version_they_are_given(tmp_path, catalog, raw):
+    version = netflix_data.dataset_version(catalog)
+    n_titles = len(load_titles(catalog, version=version))
+    # A delta ingested in the middle of a rerun
+    ingest_delta(write_delta(tmp_path, 'new.csv', raw.iloc[:10].assign(show_id=lambda df: 'x' + df['show_id'])), catalog)
+
+    rows = select_rows({'type': ['Movie'], 'search': 'love'}, catalog, version)
+    assert len(rows) == load_index(catalog, version).n_rows == n_titles
+    assert len(load_titles(catalog)) > n_titles
+
+
+def test_full_country_lists_are_coded_but_not_shown(tmp_path, catalog, raw):
+    # s1's country list is replaced by two countries
+    delta = raw[raw['show_id'] == 's1'].assign(country='France, Japan')
+    ingest_delta(write_delta(tmp_path, 'countries.csv', delta), catalog)
+
+    titles = load_titles(catalog)
+    assert 'countries' not in titles.columns
+    countries = load_titles(catalog, ['countries'])['countries']
+    codes = load_codes(catalog)
+    for row in [0, len(titles) - 1]:
+        assert codes.countries.values_of(row) == [country.strip() for country in countries.iloc[row].split(',')]
+    assert codes.countries.values_of(len(titles) - 1) == ['France', 'Japan']
@@ -0,0 +1,24 @@
+"""Count cubes streamed chunk by chunk, checked against the cube of the whole catalog."""
+import os
+
+import plotly.io as pio
+import pytest
+
+from aggregates import CountCube
+from charts import DASHBOARD_CHARTS
+from netflix_data import clean_titles, read_titles
+from streaming import stream_cube
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'netflix_titles.csv')
+
+
+def charts(cube):
+    return {chart_id: pio.to_json(build(cube), validate=False) for chart_id, build in DASHBOARD_CHARTS.items()}
+
+
+@pytest.mark.parametrize('chunk_size', [500, 1999, 100_000])
+def test_streamed_cube_matches_the_whole_catalog(chunk_size):
+    expected = CountCube.from_titles(clean_titles(read_titles(SOURCE)))
+    cube = stream_cube(SOURCE, chunk_size)
+    assert cube.total() == expected.total()
+    assert charts(cube) == charts(expected)